@@ -1,8 +1,11 @@
 # bot_agenda_penting_full_fixed_namespaced.py
 import asyncio
+import csv
+import io
 import logging
 import random
 import re
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -18,13 +21,27 @@ from telegram.ext import (
     filters,
 )
 
-from db import fetch_one, fetch_all, execute_query
-from config import TELEGRAM_API_KEY
+from db import (
+    afetch_one,
+    afetch_all,
+    aexecute_batch,
+    arun_in_transaction,
+    breaker,
+    DB_ERRORS,
+    chunked,
+    is_degraded,
+    sql_in,
+    sql_values,
+)
+from config import REMINDER_SHARD_CONFIG, TELEGRAM_API_KEY
+from sender import DELIVERED, FAILED, PERMANENT, OutgoingMessage, send_all, set_rate_share
+import leader
+import schema
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-ASK_NAMA_AGENDA, ASK_DEADLINE = range(2)
+ASK_NAMA_AGENDA, ASK_DEADLINE, ASK_IMPORT = range(3)
 
 # --- Reminder templates (randomized per stage) ---
 INITIAL_TEMPLATES = [
@@ -46,20 +63,6 @@ PANIC_TEMPLATES = [
 ]
 
 
-# --- Ensure reminder table exists (idempotent) ---
-def ensure_reminder_table():
-    q = """
-    CREATE TABLE IF NOT EXISTS agenda_reminder (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        agenda_id INT NOT NULL,
-        last_sent TIMESTAMP NULL DEFAULT NULL,
-        stage VARCHAR(30) NULL,
-        UNIQUE KEY (agenda_id)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """
-    execute_query(q)
-
-
 # ---------- Safe reply/edit helpers ----------
 async def safe_reply(update: Update, text: str, reply_markup=None, parse_mode=None):
     """Reply to message if available, else send message to chat_id."""
@@ -89,6 +92,7 @@ async def safe_edit(query, text: str, reply_markup=None, parse_mode=None):
 async def agenda_menu_send(query):
     keyboard = [
         [InlineKeyboardButton("➕ Tambah Agenda", callback_data="agenda_add")],
+        [InlineKeyboardButton("📥 Import Banyak Agenda", callback_data="agenda_import")],
         [InlineKeyboardButton("📋 Lihat Agenda Aktif", callback_data="agenda_view")],
         [InlineKeyboardButton("📋 Lihat Semua Agenda", callback_data="agenda_view_all")],
         [InlineKeyboardButton("✅ Tandai Selesai", callback_data="agenda_mark_done")],
@@ -103,6 +107,7 @@ async def agenda_menu_send(query):
 async def agenda_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
         [InlineKeyboardButton("➕ Tambah Agenda", callback_data="agenda_add")],
+        [InlineKeyboardButton("📥 Import Banyak Agenda", callback_data="agenda_import")],
         [InlineKeyboardButton("📋 Lihat Agenda Aktif", callback_data="agenda_view")],
         [InlineKeyboardButton("📋 Lihat Semua Agenda", callback_data="agenda_view_all")],
         [InlineKeyboardButton("✅ Tandai Selesai", callback_data="agenda_mark_done")],
@@ -116,15 +121,105 @@ async def agenda_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- PAGINATION MODULE (10 items per page) ---
 ITEMS_PER_PAGE = 10
+COUNT_CACHE_TTL = 60.0  # detik; jumlah halaman cukup perkiraan, gak perlu COUNT(*) tiap klik
+CURSOR_FMT = "%Y%m%d%H%M%S"
+
+# cursor keyset di callback: _<n|p><deadline YYYYmmddHHMMSS>_<id>
+_CURSOR_SUFFIX = r"(?:_(?P<dir>[np])(?P<dl>\d{14})_(?P<id>\d+))?$"
+# agenda_paginate_<status>_<page>[cursor] (maks 57 byte, limit Telegram 64)
+PAGINATE_RE = re.compile(
+    r"^agenda_paginate_(?P<status>aktif|selesai|batal|terlewat)_(?P<page>\d+)" + _CURSOR_SUFFIX
+)
+# agenda_pick_<mode>_<page>[cursor] -> picker per user (lihat/selesai/batal/hapus)
+PICKER_RE = re.compile(r"^agenda_pick_(?P<mode>view|done|cancel|delete)_(?P<page>\d+)" + _CURSOR_SUFFIX)
+
+_status_counts = {}  # status -> (total, expires_at)
+
+
+def _encode_cursor(direction: str, ag) -> str:
+    return f"{direction}{ag['deadline'].strftime(CURSOR_FMT)}_{int(ag['id'])}"
+
+
+def _parse_cursor(m):
+    """(page, direction, cursor) dari match PAGINATE_RE / PICKER_RE."""
+    direction = m.group("dir")
+    if not direction:
+        # tanpa cursor (tombol entry / tombol lama) = selalu halaman pertama
+        return 1, None, None
+    cursor = (datetime.strptime(m.group("dl"), CURSOR_FMT), int(m.group("id")))
+    return max(1, int(m.group("page"))), direction, cursor
+
 
+COUNT_BY_STATUS_QUERY = "SELECT COUNT(*) AS total FROM agenda_penting WHERE status=%s"
+
+
+async def count_by_status(status: str) -> int:
+    """Jumlah agenda per status, di-cache COUNT_CACHE_TTL detik (cuma buat indikator halaman)."""
+    cached = _status_counts.get(status)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+    row = await afetch_one(COUNT_BY_STATUS_QUERY, (status,))
+    total = int(row["total"]) if row else 0
+    _status_counts[status] = (total, now + COUNT_CACHE_TTL)
+    return total
+
+
+def invalidate_status_counts():
+    """Buang cache jumlah per status (dipanggil habis status agenda berubah)."""
+    _status_counts.clear()
+
+
+def agenda_page_query(where: str, direction: Optional[str] = None) -> str:
+    """SQL satu halaman keyset (deadline, id). Params: params `where`, [deadline, deadline, id,] limit."""
+    select = "SELECT id, nama_agenda, deadline, status FROM agenda_penting WHERE " + where
+    if direction == "n":
+        return select + " AND (deadline > %s OR (deadline = %s AND id > %s)) ORDER BY deadline ASC, id ASC LIMIT %s"
+    if direction == "p":
+        return select + " AND (deadline < %s OR (deadline = %s AND id < %s)) ORDER BY deadline DESC, id DESC LIMIT %s"
+    return select + " ORDER BY deadline ASC, id ASC LIMIT %s"
+
+
+async def fetch_agenda_page(where: str, params: tuple, direction: Optional[str] = None, cursor=None):
+    """Ambil satu halaman agenda yang cocok `where` pakai keyset (deadline, id).
+
+    Ambil ITEMS_PER_PAGE + 1 row buat deteksi halaman lanjut. direction "n" = sesudah cursor,
+    "p" = sebelum cursor, None = halaman pertama. Balikin (rows, ada_lagi_ke_arah_itu).
+    """
+    limit = ITEMS_PER_PAGE + 1
+    query = agenda_page_query(where, direction)
+    if direction is None:
+        rows = await afetch_all(query, (*params, limit))
+    else:
+        dl, ag_id = cursor
+        rows = await afetch_all(query, (*params, dl, dl, ag_id, limit))
+    if direction == "p":
+        return list(reversed(rows[:ITEMS_PER_PAGE])), len(rows) > ITEMS_PER_PAGE
+    return rows[:ITEMS_PER_PAGE], len(rows) > ITEMS_PER_PAGE
 
-def build_pagination_keyboard(status: str, page: int, total_pages: int):
-    buttons = []
+
+STATUS_WHERE = "status=%s"  # daftar per status (handle_paginate)
+
+
+async def load_agenda_page(where: str, params: tuple, page: int, direction=None, cursor=None):
+    """fetch_agenda_page + hitung posisi halaman. Balikin (rows, page, has_prev, has_next)."""
+    rows, more = await fetch_agenda_page(where, params, direction, cursor)
+    if not rows and direction:
+        # halaman yang dituju udah kosong (agenda pindah status/dihapus) -> balik ke halaman pertama
+        page, direction = 1, None
+        rows, more = await fetch_agenda_page(where, params)
+    if direction == "p":
+        return rows, (page if more else 1), more, True
+    return rows, page, page > 1, more
+
+
+def build_pagination_keyboard(prefix: str, page: int, rows, has_prev: bool, has_next: bool, item_buttons=None):
+    buttons = list(item_buttons or [])
     nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"agenda_paginate_{status}_{page-1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton("Next ➡️", callback_data=f"agenda_paginate_{status}_{page+1}"))
+    if has_prev:
+        nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"{prefix}_{page-1}_{_encode_cursor('p', rows[0])}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Next ➡️", callback_data=f"{prefix}_{page+1}_{_encode_cursor('n', rows[-1])}"))
     if nav:
         buttons.append(nav)
     buttons.append([InlineKeyboardButton("🏠 Menu Utama", callback_data="agenda_menu")])
@@ -138,35 +233,24 @@ async def handle_paginate(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     data = query.data or ""
 
-    m = re.match(r"^agenda_paginate_(?P<status>aktif|selesai|batal|terlewat)_(?P<page>\d+)$", data)
+    m = PAGINATE_RE.match(data)
     if not m:
         logger.warning("handle_paginate: invalid callback data: %s", data)
         await safe_edit(query, "Navigasi tidak dikenali. Kembali ke menu.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Kembali", callback_data="agenda_menu")]]))
         return
 
     status = m.group("status")
-    try:
-        page = int(m.group("page"))
-        if page < 1:
-            page = 1
-    except ValueError:
-        page = 1
-
-    rows = fetch_all("SELECT * FROM agenda_penting WHERE status=%s ORDER BY deadline ASC", (status,))
+    page, direction, cursor = _parse_cursor(m)
+    rows, page, has_prev, has_next = await load_agenda_page(STATUS_WHERE, (status,), page, direction, cursor)
     if not rows:
         await safe_edit(query, f"Ga ada agenda dengan status *{status}* nih, master 🥺", parse_mode="Markdown")
         return
 
-    total_pages = max(1, (len(rows) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
-    if page > total_pages:
-        page = total_pages
-
-    start = (page - 1) * ITEMS_PER_PAGE
-    end = start + ITEMS_PER_PAGE
-    sliced = rows[start:end]
+    total = await count_by_status(status)
+    total_pages = max(page + (1 if has_next else 0), (total + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
 
     text_lines = [f"📋 *Agenda dengan status {status}:* (Hal {page}/{total_pages})"]
-    for ag in sliced:
+    for ag in rows:
         dl = ag["deadline"].strftime("%Y-%m-%d %H:%M") if ag.get("deadline") else "N/A"
         text_lines.append(
             f"- {ag['id']}. *{ag['nama_agenda']}*\n  Deadline: `{dl}`\n  Status: `{ag['status']}`"
@@ -176,11 +260,97 @@ async def handle_paginate(update: Update, context: ContextTypes.DEFAULT_TYPE):
         query,
         "\n".join(text_lines),
         parse_mode="Markdown",
-        reply_markup=build_pagination_keyboard(status, page, total_pages),
+        reply_markup=build_pagination_keyboard(f"agenda_paginate_{status}", page, rows, has_prev, has_next),
+    )
+
+
+# --- Picker per user (lihat aktif / tandai selesai / batal / hapus), 10 per halaman ---
+# mode -> (filter tambahan, judul, teks kalau kosong, callback item; None = cuma daftar teks)
+PICKER_MODES = {
+    "view": ("status='aktif'", "📋 *Agenda Aktif:*", "Ga ada agenda aktif nih, master 🥺", None),
+    "done": ("status='aktif'", "Pilih agenda yang udah selesai:", "Ga ada agenda yang bisa ditandai selesai 🥺", "agenda_done_{id}"),
+    "cancel": ("status='aktif'", "Pilih agenda yang mau dibatalin:", "Ga ada agenda yang bisa dibatalin 🥺", "agenda_cancel_{id}"),
+    "delete": (None, "Pilih agenda yang mau dihapus:", "Ga ada agenda yang bisa dihapus 🥺", "agenda_delete_{id}"),
+}
+USER_ID_QUERY = "SELECT id FROM user WHERE telegram_id=%s"
+
+
+def _picker_where(mode: str) -> str:
+    extra = PICKER_MODES[mode][0]
+    return "user_id=%s" + (f" AND {extra}" if extra else "")
+
+
+MENU_PICKERS = {
+    "agenda_view": "view",
+    "agenda_mark_done": "done",
+    "agenda_mark_cancel": "cancel",
+    "agenda_delete_menu": "delete",
+}
+
+
+async def show_picker(update: Update, query, mode: str, page: int = 1, direction=None, cursor=None):
+    """Tampilkan satu halaman agenda milik user ini (idx_agenda_user_status_deadline / idx_agenda_user_deadline)."""
+    user = await afetch_one(USER_ID_QUERY, (update.effective_user.id,))
+    if not user:
+        await safe_edit(query, "Error: User belum terdaftar!")
+        return
+    _, title, empty_text, item_cb = PICKER_MODES[mode]
+    rows, page, has_prev, has_next = await load_agenda_page(_picker_where(mode), (user["id"],), page, direction, cursor)
+    if not rows:
+        await safe_edit(query, empty_text)
+        return
+
+    label = f"{title} (Hal {page})" if has_prev or has_next else title
+    if item_cb is None:
+        text_lines = [label]
+        for ag in rows:
+            dl = ag["deadline"].strftime("%Y-%m-%d %H:%M") if ag.get("deadline") else "N/A"
+            text_lines.append(f"- {ag['id']}. *{ag['nama_agenda']}* (Deadline: `{dl}`)")
+        await safe_edit(
+            query,
+            "\n".join(text_lines),
+            parse_mode="Markdown",
+            reply_markup=build_pagination_keyboard(f"agenda_pick_{mode}", page, rows, has_prev, has_next),
+        )
+        return
+
+    item_buttons = [
+        [InlineKeyboardButton(
+            f"{int(ag['id'])} • {ag['nama_agenda']}" if mode == "delete" else f"{ag['nama_agenda']}",
+            callback_data=item_cb.format(id=int(ag["id"])),
+        )]
+        for ag in rows
+    ]
+    await safe_edit(
+        query,
+        label,
+        reply_markup=build_pagination_keyboard(f"agenda_pick_{mode}", page, rows, has_prev, has_next, item_buttons),
     )
 
 
+async def handle_picker(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if not query:
+        return
+    await query.answer()
+    m = PICKER_RE.match(query.data or "")
+    if not m:
+        logger.warning("handle_picker: invalid callback data: %s", query.data)
+        return
+    page, direction, cursor = _parse_cursor(m)
+    await show_picker(update, query, m.group("mode"), page, direction, cursor)
+
+
 # --- Menu click handler ---
+# cukup cek ada/enggak, gak perlu narik semua agenda user
+HAS_AGENDA_QUERY = "SELECT id FROM agenda_penting WHERE user_id=%s LIMIT 1"
+# hapus semua agenda user + state reminder-nya (satu transaksi, param: user.id)
+DELETE_ALL_AGENDA = [
+    "DELETE FROM agenda_reminder WHERE agenda_id IN (SELECT id FROM agenda_penting WHERE user_id=%s)",
+    "DELETE FROM agenda_penting WHERE user_id=%s",
+]
+
+
 async def menu_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     if not query:
@@ -195,17 +365,14 @@ async def menu_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await safe_edit(query, "Masukin nama agenda kamu:")
         return ASK_NAMA_AGENDA
 
-    # VIEW ACTIVE
-    if data == "agenda_view":
-        rows = fetch_all("SELECT * FROM agenda_penting WHERE status='aktif' ORDER BY deadline ASC")
-        if not rows:
-            await safe_edit(query, "Ga ada agenda aktif nih, master 🥺")
-        else:
-            text_lines = ["📋 *Agenda Aktif:*"]
-            for ag in rows:
-                dl = ag["deadline"].strftime("%Y-%m-%d %H:%M") if ag.get("deadline") else "N/A"
-                text_lines.append(f"- {ag['id']}. *{ag['nama_agenda']}* (Deadline: `{dl}`)")
-            await safe_edit(query, "\n".join(text_lines), parse_mode="Markdown")
+    # IMPORT BANYAK
+    if data == "agenda_import":
+        await safe_edit(query, IMPORT_HELP, parse_mode="Markdown")
+        return ASK_IMPORT
+
+    # VIEW ACTIVE / MARK DONE / MARK CANCEL / DELETE MENU -> picker per user, 10 per halaman
+    if data in MENU_PICKERS:
+        await show_picker(update, query, MENU_PICKERS[data])
         return None
 
     # VIEW ALL (submenu) -> now uses pagination entry callbacks
@@ -225,60 +392,14 @@ async def menu_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await agenda_menu_send(query)
         return None
 
-    # MARK DONE
-    if data == "agenda_mark_done":
-        rows = fetch_all("SELECT * FROM agenda_penting WHERE status='aktif' ORDER BY deadline ASC")
-        if not rows:
-            await safe_edit(query, "Ga ada agenda yang bisa ditandai selesai 🥺")
-        else:
-            keyboard = [
-                [InlineKeyboardButton(f"{ag['nama_agenda']}", callback_data=f"agenda_done_{int(ag['id'])}")]
-                for ag in rows
-            ]
-            await safe_edit(query, "Pilih agenda yang udah selesai:", reply_markup=InlineKeyboardMarkup(keyboard))
-        return None
-
-    # MARK CANCEL
-    if data == "agenda_mark_cancel":
-        rows = fetch_all("SELECT * FROM agenda_penting WHERE status='aktif' ORDER BY deadline ASC")
-        if not rows:
-            await safe_edit(query, "Ga ada agenda yang bisa dibatalin 🥺")
-        else:
-            keyboard = [
-                [InlineKeyboardButton(f"{ag['nama_agenda']}", callback_data=f"agenda_cancel_{int(ag['id'])}")]
-                for ag in rows
-            ]
-            await safe_edit(query, "Pilih agenda yang mau dibatalin:", reply_markup=InlineKeyboardMarkup(keyboard))
-        return None
-
-    # DELETE MENU -> show list with agenda_delete_<id>
-    if data == "agenda_delete_menu":
-        rows = fetch_all("SELECT * FROM agenda_penting ORDER BY deadline ASC")
-        if not rows:
-            await safe_edit(query, "Ga ada agenda yang bisa dihapus 🥺")
-        else:
-            keyboard = []
-            for ag in rows:
-                try:
-                    aid = int(ag["id"])
-                except Exception:
-                    logger.warning("Non-int id in DB row: %s", ag)
-                    continue
-                keyboard.append(
-                    [InlineKeyboardButton(f"{aid} • {ag['nama_agenda']}", callback_data=f"agenda_delete_{aid}")]
-                )
-            keyboard.append([InlineKeyboardButton("⬅️ Kembali", callback_data="agenda_menu")])
-            await safe_edit(query, "Pilih agenda yang mau dihapus:", reply_markup=InlineKeyboardMarkup(keyboard))
-        return None
-
     # DELETE ALL AGENDA (konfirmasi flow)
     if data == "agenda_delete_all":
         telegram_id = update.effective_user.id
-        user = fetch_one("SELECT * FROM user WHERE telegram_id=%s", (telegram_id,))
+        user = await afetch_one(USER_ID_QUERY, (telegram_id,))
         if not user:
             await safe_edit(query, "Error: User belum terdaftar.")
             return None
-        rows = fetch_all("SELECT * FROM agenda_penting WHERE user_id=%s", (user["id"],))
+        rows = await afetch_all(HAS_AGENDA_QUERY, (user["id"],))
         if not rows:
             await safe_edit(query, "Master sayangg 😘 data kamu ga ada ini sayang hmphh~")
             return None
@@ -296,15 +417,15 @@ async def menu_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # KONFIRMASI YES / NO HAPUS SEMUA
     if data == "agenda_confirm_delete_all_yes":
         telegram_id = update.effective_user.id
-        user = fetch_one("SELECT * FROM user WHERE telegram_id=%s", (telegram_id,))
+        user = await afetch_one(USER_ID_QUERY, (telegram_id,))
         if not user:
             await safe_edit(query, "Error: User gak ketemu.")
             return None
-        execute_query(
-            "DELETE FROM agenda_reminder WHERE agenda_id IN (SELECT id FROM agenda_penting WHERE user_id=%s)",
-            (user["id"],),
-        )
-        execute_query("DELETE FROM agenda_penting WHERE user_id=%s", (user["id"],))
+        ok = await aexecute_batch([(q, (user["id"],)) for q in DELETE_ALL_AGENDA])
+        if not ok:
+            await safe_edit(query, "Gagal hapus semua agenda, coba lagi nanti.")
+            return None
+        invalidate_status_counts()
         await safe_edit(query, "Sudah terhapus master kaya mantan master dihapus ke tong sampah hahaha 🗑😂")
         return None
 
@@ -330,16 +451,29 @@ async def add_agenda_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ASK_DEADLINE
 
 
+def _create_agenda(tx, telegram_id, nama_agenda, deadline):
+    """Insert agenda + row agenda_reminder-nya di satu transaksi. Balikin id agenda (None kalau user belum terdaftar)."""
+    user = tx.fetch_one(USER_ID_QUERY, (telegram_id,))
+    if not user:
+        return None
+    # id dari lastrowid koneksi ini, bukan SELECT ... ORDER BY id DESC (bisa kebalik kalau insert barengan)
+    agenda_id = tx.insert(
+        "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')",
+        (user["id"], nama_agenda, deadline),
+    )
+    tx.execute(
+        "INSERT INTO agenda_reminder (agenda_id, last_sent, stage) VALUES (%s, NULL, NULL)",
+        (agenda_id,),
+    )
+    return agenda_id
+
+
 async def add_agenda_deadline(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not getattr(update, "message", None):
         return ConversationHandler.END
     raw = update.message.text.strip()
     nama_agenda = context.user_data.get("nama_agenda")
     telegram_id = update.effective_user.id
-    user = fetch_one("SELECT * FROM user WHERE telegram_id=%s", (telegram_id,))
-    if not user:
-        await safe_reply(update, "Error: User belum terdaftar!")
-        return ConversationHandler.END
 
     try:
         deadline = datetime.strptime(raw, "%Y-%m-%d %H:%M")
@@ -347,27 +481,159 @@ async def add_agenda_deadline(update: Update, context: ContextTypes.DEFAULT_TYPE
         await safe_reply(update, "Format deadline salah. Gunakan: YYYY-MM-DD HH:MM")
         return ConversationHandler.END
 
-    execute_query(
-        "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')",
-        (user["id"], nama_agenda, deadline),
-    )
+    try:
+        agenda_id = await arun_in_transaction(_create_agenda, telegram_id, nama_agenda, deadline)
+    except DB_ERRORS as e:
+        logger.error("Gagal tambah agenda user %s: %s", telegram_id, e)
+        await safe_reply(update, "Gagal nyimpen agenda, coba lagi nanti.")
+        return ConversationHandler.END
+    if agenda_id is None:
+        await safe_reply(update, "Error: User belum terdaftar!")
+        return ConversationHandler.END
+
+    invalidate_status_counts()
+    rearm_reminders()
+    await safe_reply(update, f"Agenda *{nama_agenda}* berhasil ditambah ✅", parse_mode="Markdown")
+    return ConversationHandler.END
+
 
-    last_id_row = fetch_one(
-        "SELECT id FROM agenda_penting WHERE user_id=%s AND nama_agenda=%s ORDER BY id DESC LIMIT 1",
-        (user["id"], nama_agenda),
+# --- Bulk import (tempel banyak baris / upload CSV) ---
+IMPORT_MAX_ROWS = 1000
+IMPORT_MAX_BYTES = 512 * 1024
+IMPORT_MAX_ERRORS_SHOWN = 20
+IMPORT_HELP = (
+    "Kirim banyak agenda sekaligus, satu per baris:\n"
+    "`Nama agenda | YYYY-MM-DD HH:MM`\n\n"
+    "Atau upload file CSV (kolom: nama, deadline). "
+    f"Maks {IMPORT_MAX_ROWS} agenda. Kalau ada baris yang salah, gak ada yang disimpan dulu."
+)
+
+
+def _import_rows(text: str, is_csv: bool):
+    """Pecah isi import jadi (nomor baris, [kolom...]). Teks biasa dipisah '|', CSV pakai modul csv."""
+    if not is_csv:
+        for lineno, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                yield lineno, line.split("|")
+        return
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;|\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    for cols in reader:
+        if any(c.strip() for c in cols):
+            yield reader.line_num, cols
+
+
+def parse_agenda_import(text: str, is_csv: bool = False, now: Optional[datetime] = None):
+    """Validasi semua baris sekali jalan. Balikin (rows [(nama, deadline)], errors [(baris, pesan)])."""
+    now = now or datetime.now()
+    rows, errors = [], []
+    for lineno, cols in _import_rows(text, is_csv):
+        cols = [c.strip() for c in cols]
+        if len(cols) != 2:
+            errors.append((lineno, "harus 2 kolom: nama | YYYY-MM-DD HH:MM"))
+            continue
+        nama, raw = cols
+        try:
+            deadline = datetime.strptime(raw, "%Y-%m-%d %H:%M")
+        except ValueError:
+            # baris pertama CSV boleh header (nama,deadline)
+            if is_csv and not rows and not errors and not raw[:1].isdigit():
+                continue
+            errors.append((lineno, f"format deadline salah: {raw!r}"))
+            continue
+        if not nama:
+            errors.append((lineno, "nama agenda kosong"))
+        elif len(nama) > 255:
+            errors.append((lineno, "nama agenda kepanjangan (maks 255 karakter)"))
+        elif deadline <= now:
+            errors.append((lineno, f"deadline {raw} udah lewat"))
+        else:
+            rows.append((nama, deadline))
+    if len(rows) > IMPORT_MAX_ROWS:
+        errors.append((0, f"kebanyakan: {len(rows)} agenda, maks {IMPORT_MAX_ROWS} sekali import"))
+    return rows, errors
+
+
+def _insert_agendas(tx, telegram_id, rows):
+    """Insert semua agenda hasil import (INSERT multi-row per chunk) + row agenda_reminder, satu transaksi."""
+    user = tx.fetch_one(USER_ID_QUERY, (telegram_id,))
+    if not user:
+        return None
+    for chunk in chunked(rows):
+        values, params = sql_values((user["id"], nama, deadline, "aktif") for nama, deadline in chunk)
+        tx.execute(f"INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES {values}", params)
+    # id hasil INSERT multi-row gak bisa diandalkan dari lastrowid (beda MySQL/SQLite) -> isi lewat anti-join
+    tx.execute(
+        "INSERT IGNORE INTO agenda_reminder (agenda_id, last_sent, stage) "
+        "SELECT a.id, NULL, NULL FROM agenda_penting a LEFT JOIN agenda_reminder r ON r.agenda_id = a.id "
+        "WHERE a.user_id=%s AND a.status='aktif' AND r.agenda_id IS NULL",
+        (user["id"],),
     )
-    if last_id_row:
-        execute_query(
-            "INSERT IGNORE INTO agenda_reminder (agenda_id, last_sent, stage) VALUES (%s, NULL, NULL)",
-            (last_id_row["id"],),
-        )
+    return len(rows)
 
-    await safe_reply(update, f"Agenda *{nama_agenda}* berhasil ditambah ✅", parse_mode="Markdown")
+
+def _import_report(errors) -> str:
+    lines = [f"❌ Import dibatalin, {len(errors)} baris bermasalah (gak ada yang disimpan):"]
+    for lineno, msg in errors[:IMPORT_MAX_ERRORS_SHOWN]:
+        lines.append(f"• baris {lineno}: {msg}" if lineno else f"• {msg}")
+    if len(errors) > IMPORT_MAX_ERRORS_SHOWN:
+        lines.append(f"…dan {len(errors) - IMPORT_MAX_ERRORS_SHOWN} lagi")
+    lines.append("Perbaiki terus kirim ulang semuanya ya.")
+    return "\n".join(lines)
+
+
+async def import_agendas(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = getattr(update, "message", None)
+    if not message:
+        return ConversationHandler.END
+    document = message.document
+    if document:
+        if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+            await safe_reply(update, f"File kegedean, maks {IMPORT_MAX_BYTES // 1024} KB.")
+            return ConversationHandler.END
+        data = await (await document.get_file()).download_as_bytearray()
+        try:
+            text = bytes(data).decode("utf-8-sig")
+        except UnicodeDecodeError:
+            await safe_reply(update, "File harus CSV teks UTF-8.")
+            return ConversationHandler.END
+    else:
+        text = message.text or ""
+
+    rows, errors = parse_agenda_import(text, is_csv=bool(document))
+    if errors:
+        await safe_reply(update, _import_report(errors))
+        return ConversationHandler.END
+    if not rows:
+        await safe_reply(update, "Gak ada agenda yang kebaca.\n\n" + IMPORT_HELP, parse_mode="Markdown")
+        return ConversationHandler.END
+
+    telegram_id = update.effective_user.id
+    try:
+        inserted = await arun_in_transaction(_insert_agendas, telegram_id, rows)
+    except DB_ERRORS as e:
+        logger.error("Gagal import agenda user %s: %s", telegram_id, e)
+        await safe_reply(update, "Gagal nyimpen agenda, coba lagi nanti.")
+        return ConversationHandler.END
+    if inserted is None:
+        await safe_reply(update, "Error: User belum terdaftar!")
+        return ConversationHandler.END
+
+    invalidate_status_counts()
+    rearm_reminders()
+    await safe_reply(update, f"📥 {inserted} agenda berhasil diimport ✅")
     return ConversationHandler.END
 
 
 # --- Action handler (done / cancel / delete) with robust parsing ---
 ACTION_ID_RE = re.compile(r"^agenda_(done|cancel|delete)_(\d+)$")
+# cuma pemilik agenda yang boleh ubah/hapus (callback data bisa dipalsuin)
+OWNED_AGENDA_QUERY = (
+    "SELECT a.id, a.status FROM agenda_penting a JOIN user u ON u.id = a.user_id WHERE a.id=%s AND u.telegram_id=%s"
+)
 
 
 async def action_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -390,34 +656,45 @@ async def action_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     action = m.group(1)
     ag_id = int(m.group(2))
 
-    agenda = fetch_one("SELECT * FROM agenda_penting WHERE id=%s", (ag_id,))
+    agenda = await afetch_one(OWNED_AGENDA_QUERY, (ag_id, update.effective_user.id))
     if not agenda:
         await safe_edit(query, f"Agenda dengan ID `{ag_id}` gak ditemukan di database.", parse_mode="Markdown")
         return
 
+    # status/hapus agenda + bersihin agenda_reminder dalam satu transaksi
+    clear_reminder = ("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ag_id,))
     if action == "done":
-        ok = execute_query("UPDATE agenda_penting SET status='selesai' WHERE id=%s", (ag_id,))
+        ok = await aexecute_batch([
+            ("UPDATE agenda_penting SET status='selesai' WHERE id=%s", (ag_id,)),
+            clear_reminder,
+        ])
         if ok:
-            execute_query("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ag_id,))
             await safe_edit(query, "Agenda udah ditandai selesai ✅")
         else:
             await safe_edit(query, "Gagal menandai selesai, coba lagi nanti.")
     elif action == "cancel":
-        ok = execute_query("UPDATE agenda_penting SET status='batal' WHERE id=%s", (ag_id,))
+        ok = await aexecute_batch([
+            ("UPDATE agenda_penting SET status='batal' WHERE id=%s", (ag_id,)),
+            clear_reminder,
+        ])
         if ok:
-            execute_query("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ag_id,))
             await safe_edit(query, "Agenda dibatalin ❌")
         else:
             await safe_edit(query, "Gagal membatalkan agenda, coba lagi nanti.")
     elif action == "delete":
-        ok = execute_query("DELETE FROM agenda_penting WHERE id=%s", (ag_id,))
+        ok = await aexecute_batch([
+            clear_reminder,
+            ("DELETE FROM agenda_penting WHERE id=%s", (ag_id,)),
+        ])
         if ok:
-            execute_query("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ag_id,))
             await safe_edit(query, "Agenda dihapus 🗑")
         else:
             await safe_edit(query, "Gagal hapus agenda, coba lagi nanti.")
     else:
         await safe_edit(query, "Aksi nggak dikenali.")
+        return
+    invalidate_status_counts()
+    rearm_reminders()
 
 
 # --- Reminder text builder using templates ---
@@ -455,94 +732,286 @@ def build_reminder_text(nama_agenda: str, deadline: datetime, time_left: timedel
     return f"🔔 Agenda *{nama_agenda}* — Deadline: `{dl}`"
 
 
-# --- Reminder loop ---
-async def reminder_loop(application: Application):
-    logger.info("Reminder loop started")
+# --- Reminder scheduler ---
+REMINDER_WINDOW = timedelta(hours=5)  # reminder pertama dikirim 5 jam sebelum deadline
+HOURLY_INTERVAL = timedelta(hours=1)
+PANIC_WINDOW = timedelta(hours=1)  # 1 jam terakhir = panic mode
+PANIC_INTERVAL = timedelta(minutes=15)
+REMINDER_MAX_IDLE = 300.0  # detik; batas tidur biar perubahan di luar bot (edit DB manual, error DB sesaat) tetap kebaca
+REMINDER_WAKE_SLACK = 1.0  # detik; bangun sedikit telat biar gak kecepetan sepersekian detik
+REMINDER_RETRY_DELAY = timedelta(seconds=30)  # jeda coba kirim ulang kalau Telegram/network lagi error
+REMINDER_CHANGE_POLL = 30.0  # detik; loop yang lagi tidur ngecek agenda baru dari instance lain segini sekali
+
+_reminder_wakeups: list = []  # satu event per reminder_loop (per shard)
+
+
+def next_reminder_at(deadline: datetime, last_sent: Optional[datetime]) -> datetime:
+    """Kapan agenda ini butuh aksi berikutnya: reminder initial/hourly/panic atau expired."""
+    if last_sent is None:
+        due = deadline - REMINDER_WINDOW
+    else:
+        # hourly jalan tiap jam; begitu masuk panic window, jaraknya 15 menit dari kiriman terakhir
+        due = min(last_sent + HOURLY_INTERVAL, max(last_sent + PANIC_INTERVAL, deadline - PANIC_WINDOW))
+    return min(due, deadline)
+
+
+def rearm_reminders():
+    """Bangunin semua reminder_loop biar jadwal dihitung ulang (agenda baru / berubah status)."""
+    for event in _reminder_wakeups:
+        event.set()
+
+
+# rearm_reminders cuma kedengeran di proses yang sama; agenda yang dibuat di instance lain (webhook,
+# shard worker di host lain) ketahuan dari id terbesar yang berubah. Lookup ujung PK, murah.
+AGENDA_MARKER_QUERY = "SELECT MAX(id) AS max_id FROM agenda_penting"
+
+
+async def _agenda_marker():
+    row = await afetch_one(AGENDA_MARKER_QUERY, primary=True)
+    return row["max_id"] if row else None
+
+
+async def _idle(wakeup: asyncio.Event, timeout: float, marker):
+    """Tidur sampai timeout, rearm lokal, atau ada agenda baru dari instance lain (dicek tiap REMINDER_CHANGE_POLL)."""
+    until = time.monotonic() + timeout
     while True:
+        left = until - time.monotonic()
+        if left <= 0:
+            return
         try:
-            rows = fetch_all(
-                """
-                SELECT a.id, a.user_id, a.nama_agenda, a.deadline, u.telegram_id
-                FROM agenda_penting a
-                JOIN user u ON a.user_id = u.id
-                WHERE a.status = 'aktif'
-                """
+            await asyncio.wait_for(wakeup.wait(), min(left, REMINDER_CHANGE_POLL))
+            return
+        except asyncio.TimeoutError:
+            pass
+        if until - time.monotonic() > 0 and await _agenda_marker() != marker:
+            return
+
+
+def _shard_filter(shard, column):
+    """Potongan WHERE + params buat shard (k, n): cuma agenda dengan user_id % n == k."""
+    if shard is None:
+        return "", ()
+    k, n = shard
+    return f" AND MOD({column}, %s) = %s", (n, k)
+
+
+# cuma agenda yang deadline-nya <= now + 5 jam yang bisa butuh aksi; range scan idx_agenda_status_deadline
+REMINDER_WINDOW_QUERY = """
+    SELECT a.id, a.nama_agenda, a.deadline, u.telegram_id, r.last_sent
+    FROM agenda_penting a
+    JOIN user u ON a.user_id = u.id
+    LEFT JOIN agenda_reminder r ON r.agenda_id = a.id
+    WHERE a.status = 'aktif' AND a.deadline <= %s
+"""
+NEXT_OUTSIDE_WINDOW_QUERY = (
+    "SELECT MIN(deadline) AS next_deadline FROM agenda_penting WHERE status = 'aktif' AND deadline > %s"
+)
+
+
+async def _flush_reminder_state(expired_ids, sent):
+    """Tulis semua perubahan state satu tick dalam satu transaksi: statement multi-row, bukan satu per agenda."""
+    statements = []
+    for ids in chunked(expired_ids):
+        ph = sql_in(ids)
+        # status='aktif': agenda yang keburu ditandai selesai/batal di tengah tick gak ketimpa
+        statements.append((f"UPDATE agenda_penting SET status='terlewat' WHERE id IN ({ph}) AND status='aktif'", ids))
+        statements.append((f"DELETE FROM agenda_reminder WHERE agenda_id IN ({ph})", ids))
+    for rows in chunked(sent):
+        values, params = sql_values(rows)
+        statements.append((
+            f"INSERT INTO agenda_reminder (agenda_id, last_sent, stage) VALUES {values} "
+            "ON DUPLICATE KEY UPDATE last_sent=VALUES(last_sent), stage=VALUES(stage)",
+            params,
+        ))
+        # agenda yang keburu selesai/batal/dihapus selama pesan dikirim: row state-nya udah dihapus
+        # action_handler, upsert di atas jangan sampai ngidupin lagi
+        ids = [row[0] for row in rows]
+        statements.append((
+            f"DELETE FROM agenda_reminder WHERE agenda_id IN ({sql_in(ids)}) AND NOT EXISTS ("
+            "SELECT 1 FROM agenda_penting a WHERE a.id = agenda_reminder.agenda_id AND a.status = 'aktif')",
+            ids,
+        ))
+    if expired_ids:
+        invalidate_status_counts()
+    if statements and not await aexecute_batch(statements):
+        logger.error("Gagal simpan state reminder (%d terlewat, %d terkirim)", len(expired_ids), len(sent))
+
+
+async def _reminder_tick(application: Application, now: datetime, shard=None) -> Optional[datetime]:
+    """Proses agenda yang udah jatuh tempo; balikin instant reminder berikutnya (None kalau gak ada agenda aktif).
+
+    shard = (k, n) -> cuma agenda milik shard itu; None = semua agenda.
+    """
+    next_at = None
+    shard_sql, shard_params = _shard_filter(shard, "a.user_id")
+    # state reminder dari tick sebelumnya -> baca dari primary; replica lag = reminder dobel
+    due_rows = await afetch_all(
+        REMINDER_WINDOW_QUERY + shard_sql, (now + REMINDER_WINDOW, *shard_params), rows="record", primary=True
+    )
+    if is_degraded():
+        # DB putus: jangan nebak state reminder dari hasil kosong
+        return now
+    outgoing = []
+    planned = {}  # agenda_id -> (deadline, stage; None = expired)
+    for ag in due_rows:
+        agenda_id = ag["id"]
+        nama = ag["nama_agenda"]
+        deadline: datetime = _to_dt(ag["deadline"])
+        user_tid = ag["telegram_id"]
+        last_sent = _to_dt(ag["last_sent"])
+
+        time_left = deadline - now
+
+        # Deadline passed
+        if time_left.total_seconds() <= 0:
+            text = (
+                f"⛔ *Waktu Habis!* Agenda *{nama}* udah lewat deadline "
+                f"(`{deadline.strftime('%Y-%m-%d %H:%M')}`) dan otomatis ditandai *terlewat*."
             )
-            now = datetime.now()
-            for ag in rows:
-                agenda_id = ag["id"]
-                nama = ag["nama_agenda"]
-                deadline: datetime = ag["deadline"]
-                user_tid = ag["telegram_id"]
-
-                rem = fetch_one("SELECT * FROM agenda_reminder WHERE agenda_id=%s", (agenda_id,))
-                last_sent_raw = rem["last_sent"] if rem else None
-                last_sent = _to_dt(last_sent_raw)
-                stage = rem["stage"] if rem else None
-
-                time_left = deadline - now
-
-                # Deadline passed
-                if time_left.total_seconds() <= 0:
-                    execute_query("UPDATE agenda_penting SET status='terlewat' WHERE id=%s", (agenda_id,))
-                    execute_query("DELETE FROM agenda_reminder WHERE agenda_id=%s", (agenda_id,))
-                    text = (
-                        f"⛔ *Waktu Habis!* Agenda *{nama}* udah lewat deadline "
-                        f"(`{deadline.strftime('%Y-%m-%d %H:%M')}`) dan otomatis ditandai *terlewat*."
-                    )
-                    try:
-                        await application.bot.send_message(chat_id=user_tid, text=text, parse_mode="Markdown")
-                    except Exception as e:
-                        logger.warning("Gagal kirim notifikasi terlewat: %s", e)
-                    continue
-
-                # Only start reminders if within 5 hours
-                if time_left <= timedelta(hours=5):
-                    desired_stage = "hourly" if time_left > timedelta(hours=1) else "panic"
-
-                    if not last_sent:
-                        text = build_reminder_text(nama, deadline, time_left, "initial")
-                        try:
-                            await application.bot.send_message(chat_id=user_tid, text=text, parse_mode="Markdown")
-                        except Exception as e:
-                            logger.warning("Gagal kirim reminder initial: %s", e)
-                        execute_query(
-                            "INSERT INTO agenda_reminder (agenda_id, last_sent, stage) VALUES (%s, %s, %s) "
-                            "ON DUPLICATE KEY UPDATE last_sent=%s, stage=%s",
-                            (agenda_id, now, desired_stage, now, desired_stage),
-                        )
-                        continue
-
-                    if desired_stage == "hourly":
-                        if last_sent is None or (now - last_sent) >= timedelta(hours=1):
-                            text = build_reminder_text(nama, deadline, time_left, "hourly")
-                            try:
-                                await application.bot.send_message(chat_id=user_tid, text=text, parse_mode="Markdown")
-                            except Exception as e:
-                                logger.warning("Gagal kirim reminder hourly: %s", e)
-                            execute_query(
-                                "UPDATE agenda_reminder SET last_sent=%s, stage=%s WHERE agenda_id=%s",
-                                (now, "hourly", agenda_id),
-                            )
-
-                    elif desired_stage == "panic":
-                        if last_sent is None or (now - last_sent) >= timedelta(minutes=15):
-                            text = build_reminder_text(nama, deadline, time_left, "panic")
-                            try:
-                                await application.bot.send_message(chat_id=user_tid, text=text, parse_mode="Markdown")
-                            except Exception as e:
-                                logger.warning("Gagal kirim reminder panic: %s", e)
-                            execute_query(
-                                "UPDATE agenda_reminder SET last_sent=%s, stage=%s WHERE agenda_id=%s",
-                                (now, "panic", agenda_id),
-                            )
-
-            await asyncio.sleep(60)
+            outgoing.append(OutgoingMessage(agenda_id, user_tid, text, {"parse_mode": "Markdown"}))
+            planned[agenda_id] = (deadline, None)
+            continue
+
+        # Only start reminders if within 5 hours
+        if time_left <= REMINDER_WINDOW:
+            desired_stage = "hourly" if time_left > PANIC_WINDOW else "panic"
+
+            if not last_sent:
+                kind = "initial"
+            elif desired_stage == "hourly" and (now - last_sent) >= HOURLY_INTERVAL:
+                kind = "hourly"
+            elif desired_stage == "panic" and (now - last_sent) >= PANIC_INTERVAL:
+                kind = "panic"
+            else:
+                kind = None
+
+            if kind:
+                text = build_reminder_text(nama, deadline, time_left, kind)
+                outgoing.append(OutgoingMessage(agenda_id, user_tid, text, {"parse_mode": "Markdown"}))
+                planned[agenda_id] = (deadline, desired_stage)
+                continue
+
+        due = next_reminder_at(deadline, last_sent)
+        if next_at is None or due < next_at:
+            next_at = due
+
+    if outgoing:
+        results, stats = await send_all(application.bot, outgoing)
+        logger.info(
+            "Reminder tick: %d terkirim, %d gagal (%d permanen), %d throttled, %.1fs",
+            stats[DELIVERED], stats[FAILED] + stats[PERMANENT], stats[PERMANENT], stats["throttled"], stats["elapsed"],
+        )
+        expired_ids = []
+        sent = []  # (agenda_id, last_sent, stage) -> di-flush sekali di akhir tick
+        for agenda_id, (deadline, stage) in planned.items():
+            if results.get(agenda_id) == FAILED:
+                # gagal sementara: state gak ditulis biar dicoba lagi, bukan hilang diam-diam
+                due = now + REMINDER_RETRY_DELAY
+            elif stage is None:
+                # delivered / permanen (bot diblokir dsb): tetap dicatat biar gak dikirim ulang terus
+                expired_ids.append(agenda_id)
+                continue
+            else:
+                sent.append((agenda_id, now, stage))
+                due = next_reminder_at(deadline, now)
+            if next_at is None or due < next_at:
+                next_at = due
+        await _flush_reminder_state(expired_ids, sent)
+
+    # agenda di luar window: yang paling dekat baru butuh reminder initial pas deadline-nya masuk window
+    shard_sql, shard_params = _shard_filter(shard, "user_id")
+    row = await afetch_one(NEXT_OUTSIDE_WINDOW_QUERY + shard_sql, (now + REMINDER_WINDOW, *shard_params), primary=True)
+    next_deadline = _to_dt(row["next_deadline"]) if row else None
+    if next_deadline is not None:
+        due = next_deadline - REMINDER_WINDOW
+        if next_at is None or due < next_at:
+            next_at = due
+    return next_at
+
+
+async def reminder_loop(application: Application, shard=None, lease=None):
+    """Tidur sampai reminder terdekat jatuh tempo (atau dibangunin rearm_reminders), bukan polling tiap menit.
+
+    shard = (k, n) -> worker buat satu shard, jalan selama `lease` (lease shard / leader.ALWAYS) dipegang.
+    Tanpa shard: semua agenda, di instance yang pegang lease "periodic".
+    """
+    wakeup = asyncio.Event()
+    _reminder_wakeups.append(wakeup)
+    lease = lease or leader.get_lease()
+    logger.info("Reminder loop started%s", f" (shard {shard[0]}/{shard[1]})" if shard else "")
+    while True:
+        try:
+            if not lease.is_leader():
+                # instance lain yang pegang lease -> standby sampai lease-nya lepas/expired/dibagi ulang
+                await lease.wait_until_leader()
+                continue
+            if is_degraded():
+                # DB lagi down: gak usah nembak query, tunggu sampai breaker boleh probe
+                await asyncio.sleep(min(max(breaker.retry_in(), 1), 60))
+                continue
+            wakeup.clear()
+            # marker dibaca sebelum tick: agenda yang masuk selama tick tetap kelihatan sebagai perubahan
+            marker = await _agenda_marker()
+            next_at = await _reminder_tick(application, datetime.now(), shard)
+
+            timeout = REMINDER_MAX_IDLE
+            if next_at is not None:
+                wait = (next_at - datetime.now()).total_seconds() + REMINDER_WAKE_SLACK
+                timeout = min(max(wait, 0.0), REMINDER_MAX_IDLE)
+            logger.debug("Reminder berikutnya: %s (tidur %.1fs)", next_at, timeout)
+            await _idle(wakeup, timeout, marker)
         except Exception as e:
             logger.exception("Error di reminder loop: %s", e)
             await asyncio.sleep(5)
 
 
+def _spawn(application: Application, coro):
+    try:
+        application.create_task(coro)
+    except Exception:
+        asyncio.get_event_loop().create_task(coro)
+
+
+def start_reminder_workers(application: Application):
+    """Jalanin reminder_loop: satu loop (leader) atau satu per shard sesuai REMINDER_SHARD_CONFIG."""
+    shards = REMINDER_SHARD_CONFIG["shards"]
+    if shards <= 1:
+        _spawn(application, reminder_loop(application))
+        return
+    if REMINDER_SHARD_CONFIG["shard_ids"]:
+        # pembagian statis: instance ini pegang shard yang ditulis di config, tanpa lease
+        for k in REMINDER_SHARD_CONFIG["shard_ids"]:
+            _spawn(application, reminder_loop(application, (k % shards, shards), leader.ALWAYS))
+        return
+    # tiap instance yang hidup kirim barengan -> rate Telegram (per bot) dibagi rata ke semuanya
+    coord = leader.get_coordinator("reminder-shard", shards, on_members=lambda n: set_rate_share(1 / n))
+    coord.start()
+    for k, lease in enumerate(coord.leases):
+        # loop shard yang lagi gak dipegang instance ini cuma nunggu di lease.wait_until_leader()
+        _spawn(application, reminder_loop(application, (k, shards), lease))
+
+
+# --- Query hot path buat EXPLAIN check (python schema.py): query asli di atas + contoh params ---
+_SAMPLE_DT = "2025-01-01 05:00:00"
+HOT_QUERIES = [
+    ("reminder window", REMINDER_WINDOW_QUERY, (_SAMPLE_DT,)),
+    ("reminder window (shard)", REMINDER_WINDOW_QUERY + _shard_filter((1, 4), "a.user_id")[0], (_SAMPLE_DT, 4, 1)),
+    ("reminder next", NEXT_OUTSIDE_WINDOW_QUERY, (_SAMPLE_DT,)),
+    ("reminder marker", AGENDA_MARKER_QUERY, ()),
+    ("reminder next (shard)", NEXT_OUTSIDE_WINDOW_QUERY + _shard_filter((1, 4), "user_id")[0], (_SAMPLE_DT, 4, 1)),
+    ("handle_paginate (first)", agenda_page_query(STATUS_WHERE), ("selesai", 11)),
+    ("handle_paginate (next)", agenda_page_query(STATUS_WHERE, "n"), ("selesai", _SAMPLE_DT, _SAMPLE_DT, 1, 11)),
+    ("handle_paginate (prev)", agenda_page_query(STATUS_WHERE, "p"), ("selesai", _SAMPLE_DT, _SAMPLE_DT, 1, 11)),
+    ("count_by_status", COUNT_BY_STATUS_QUERY, ("selesai",)),
+    ("show_picker (aktif)", agenda_page_query(_picker_where("view"), "n"), (1, _SAMPLE_DT, _SAMPLE_DT, 1, 11)),
+    ("show_picker (hapus)", agenda_page_query(_picker_where("delete")), (1, 11)),
+    ("user by telegram_id", USER_ID_QUERY, (1,)),
+    ("menu_click (ada agenda?)", HAS_AGENDA_QUERY, (1,)),
+    *[(f"menu_click (delete all #{i})", q, (1,)) for i, q in enumerate(DELETE_ALL_AGENDA, 1)],
+    ("action_handler", OWNED_AGENDA_QUERY, (1, 1)),
+]
+
+
 # --- Bot commands on startup ---
 async def set_bot_commands(application: Application):
     commands = [
@@ -553,13 +1022,9 @@ async def set_bot_commands(application: Application):
 
 async def on_startup(application: Application):
     logger.info("Bot starting up (Agenda Penting)...")
-    ensure_reminder_table()
+    await schema.amigrate()  # no-op kalau main.py sudah migrasi
     await set_bot_commands(application)
-    try:
-        application.create_task(reminder_loop(application))
-    except Exception:
-        loop = asyncio.get_event_loop()
-        loop.create_task(reminder_loop(application))
+    start_reminder_workers(application)
 
 
 # --- Register handlers (modular) ---
@@ -569,10 +1034,14 @@ def register_handlers(app: Application):
     Call this from main.py: e.g. agenda.register_handlers(app)
     """
     conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(menu_click, pattern="^agenda_add$")],
+        entry_points=[CallbackQueryHandler(menu_click, pattern="^agenda_(add|import)$")],
         states={
             ASK_NAMA_AGENDA: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_agenda_name)],
             ASK_DEADLINE: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_agenda_deadline)],
+            ASK_IMPORT: [
+                MessageHandler(filters.Document.ALL, import_agendas),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, import_agendas),
+            ],
         },
         fallbacks=[],
     )
@@ -584,7 +1053,8 @@ def register_handlers(app: Application):
     app.add_handler(CallbackQueryHandler(action_handler, pattern=r"^agenda_(done|cancel|delete)_\d+$"))
 
     # Pagination handler (tight pattern)
-    app.add_handler(CallbackQueryHandler(handle_paginate, pattern=r"^agenda_paginate_(aktif|selesai|batal|terlewat)_\d+$"))
+    app.add_handler(CallbackQueryHandler(handle_paginate, pattern=PAGINATE_RE))
+    app.add_handler(CallbackQueryHandler(handle_picker, pattern=PICKER_RE))
 
     # Menu clicks (exclude add since conv entry handles it)
     app.add_handler(
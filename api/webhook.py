@@ -4,6 +4,7 @@ import logging
 from flask import Flask, request, jsonify, Response
 from telegram import Update
 from main import application  # ambil bot application dari main.py
+import schema
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -26,6 +27,12 @@ init_future = asyncio.run_coroutine_threadsafe(application.initialize(), _loop)
 init_future.result()  # tunggu selesai
 logger.info("✅ Application initialized di webhook.py")
 
+# initialize() gak manggil post_init (main.on_startup), jadi migrasi skema dijalanin di sini
+try:
+    logger.info("✅ Skema DB versi %s", schema.migrate())
+except Exception as e:
+    logger.exception("❌ Migrasi skema gagal: %s", e)
+
 
 @app.route("/", methods=["GET"])
 def home():
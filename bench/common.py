@@ -0,0 +1,69 @@
+# Setup bareng buat script benchmark di folder ini.
+# Selalu jalan di SQLite sementara (data diisi ulang tiap run), jadi gak pernah nyentuh DB di .env.
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# proses anak (multiprocessing) ikut pakai DB induknya lewat BOT_BENCH_DB
+if "BOT_BENCH_DB" not in os.environ:
+    os.environ["BOT_BENCH_DB"] = os.path.join(tempfile.mkdtemp(prefix="bot-bench-"), "bench.db")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.environ["BOT_BENCH_DB"]
+os.environ.setdefault("TELEGRAM_API_KEY", "bench")
+os.environ.setdefault("DB_SLOW_QUERY_MS", "60000")  # scan besar di sini memang lambat, gak usah di-log
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import schema  # noqa: E402
+
+schema.migrate()
+logging.disable(logging.INFO)  # log per tick cuma bikin output ramai
+
+
+def add_users(n):
+    """Daftarin user telegram_id 1..n dengan user.id 1..n (eksplisit, biar tetap sama habis DELETE)."""
+    db.execute_many(
+        "INSERT INTO user (id, telegram_id, username) VALUES (%s, %s, %s)", [(i, i, f"u{i}") for i in range(1, n + 1)]
+    )
+
+
+class FakeBot:
+    """Bot palsu: catat chat_id tiap pesan, opsional pura-pura latency Telegram."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append(chat_id)
+
+
+class FakeApp:
+    def __init__(self, bot=None):
+        self.bot = bot or FakeBot()
+
+
+def query_count():
+    """Total query sejak reset_query_stats() terakhir."""
+    return sum(s["calls"] for s in db.query_stats())
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def timed(coro_fn, repeat=1):
+    """Jalanin coro_fn() `repeat` kali, balikin (hasil terakhir, list durasi ms)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await coro_fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return result, durations
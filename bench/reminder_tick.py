@@ -0,0 +1,81 @@
+"""Benchmark satu tick reminder_loop: query per tick + durasi, pola lama (N+1) vs windowed join.
+
+    python bench/reminder_tick.py [--agendas 100000] [--users 1000] [--due 100]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import common
+from common import db
+
+import agenda1
+import sender
+
+# pola tick lama: scan semua agenda aktif, lalu 1 SELECT agenda_reminder per agenda
+LEGACY_SCAN_QUERY = """
+    SELECT a.id, a.user_id, a.nama_agenda, a.deadline, u.telegram_id
+    FROM agenda_penting a
+    JOIN user u ON a.user_id = u.id
+    WHERE a.status = 'aktif'
+"""
+LEGACY_REMINDER_QUERY = "SELECT * FROM agenda_reminder WHERE agenda_id=%s"
+
+
+async def legacy_tick(now):
+    """Bagian baca tick lama (steady state: gak ada yang perlu dikirim, jadi gak ada write)."""
+    async for ag in db.afetch_iter(LEGACY_SCAN_QUERY, rows="record", primary=True):
+        rem = await db.afetch_one(LEGACY_REMINDER_QUERY, (ag["id"],), primary=True)
+        agenda1.next_reminder_at(ag["deadline"], agenda1._to_dt(rem["last_sent"]) if rem else None)
+
+
+def seed(now, n_agendas, n_users, n_due):
+    rnd = random.Random(12)
+    common.add_users(n_users)
+    rows = []
+    for i in range(n_agendas):
+        if i < n_due:
+            # di dalam window 5 jam (tapi belum panic) -> kena reminder initial di tick pertama
+            deadline = now + timedelta(minutes=rnd.randint(70, 290))
+        else:
+            deadline = now + timedelta(days=rnd.randint(1, 60), minutes=rnd.randint(0, 1440))
+        rows.append((rnd.randint(1, n_users), f"agenda {i}", deadline))
+    for chunk in db.chunked(rows, 10000):
+        db.execute_many(
+            "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')", chunk
+        )
+
+
+async def measure(name, tick):
+    db.reset_query_stats()
+    started = time.perf_counter()
+    await tick()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{name:<20} {common.query_count():>7} query/tick {elapsed:>10.1f} ms")
+
+
+async def main(args):
+    now = datetime.now().replace(microsecond=0)
+    seed(now, args.agendas, args.users, args.due)
+    sender.SEND_CONFIG.update(rate_per_sec=1e6, per_chat_interval=0)
+    app = common.FakeApp()
+
+    # tick pertama kirim reminder initial ke agenda yang sudah di window; yang diukur tick steady state sesudahnya
+    await agenda1._reminder_tick(app, now)
+    assert len(app.bot.sent) == args.due, len(app.bot.sent)
+    later = now + timedelta(minutes=1)
+
+    print(f"{args.agendas} agenda aktif, {args.due} di window 5 jam, {args.users} user (SQLite)")
+    await measure("lama (N+1)", lambda: legacy_tick(later))
+    await measure("windowed join", lambda: agenda1._reminder_tick(app, later))
+    assert len(app.bot.sent) == args.due, "tick steady state gak boleh kirim ulang"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agendas", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--due", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""Benchmark memori + alokasi fetch_all: rows="dict" vs rows="record".
+
+    python bench/row_memory.py [--rows 100000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import common
+from common import db
+
+# bentuk row sama kayak scan reminder (5 kolom)
+QUERY = """
+    SELECT a.id, a.user_id, a.nama_agenda, a.deadline, u.telegram_id
+    FROM agenda_penting a
+    JOIN user u ON a.user_id = u.id
+    WHERE a.status = 'aktif'
+"""
+
+
+def seed(n_rows, n_users=1000):
+    common.add_users(n_users)
+    base = datetime(2030, 1, 1)
+    rows = [(i % n_users + 1, f"agenda {i}", base + timedelta(minutes=i)) for i in range(n_rows)]
+    for chunk in db.chunked(rows, 10000):
+        db.execute_many(
+            "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')", chunk
+        )
+
+
+def measure(mode):
+    db.fetch_all(QUERY + " LIMIT 1", rows=mode)  # tipe record + koneksi sudah siap, gak ikut kehitung
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = db.fetch_all(QUERY, rows=mode)
+    elapsed = (time.perf_counter() - started) * 1000
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    n = len(rows)
+    del rows
+    return n, retained, peak, blocks, elapsed
+
+
+def main(args):
+    seed(args.rows)
+    print(f"fetch_all {args.rows} row x 5 kolom (SQLite, waktu diukur dengan tracemalloc nyala)")
+    print(f"{'mode':<8} {'retained':>10} {'peak':>10} {'blok hidup':>11} {'waktu':>10}")
+    for mode in ("dict", "record"):
+        n, retained, peak, blocks, elapsed = measure(mode)
+        assert n == args.rows, n
+        mb = 1024 * 1024
+        print(f"{mode:<8} {retained / mb:>8.1f}MB {peak / mb:>8.1f}MB {blocks:>11} {elapsed:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    main(parser.parse_args())
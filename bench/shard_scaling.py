@@ -0,0 +1,110 @@
+"""Benchmark scaling reminder per shard worker (reminder/detik vs jumlah worker).
+
+    python bench/shard_scaling.py [--send-reminders 125] [--db-reminders 20000] [--workers 1 2 4 8]
+
+Tiap worker = proses sendiri (kayak satu instance bot) yang jalanin satu _reminder_tick(shard=(k, n)).
+Dua skenario:
+- kirim jadi bottleneck: limiter asli (SEND_RATE_PER_SEC, per_chat_interval) dan jatahnya dibagi rata
+  ke worker kayak ShardCoordinator (set_rate_share(1 / n)), bot palsu latency 20 ms. Total kirim harus
+  mentok di limit per bot, nambah worker gak boleh bikin lebih cepat.
+- tick DB jadi bottleneck: limiter dibuka dan bot tanpa latency, jadi yang diukur scan window,
+  susun pesan dan flush state per shard.
+Selain wall time, dicatat CPU time worker paling berat: itu yang nentuin throughput kalau tiap worker
+dapat core sendiri (host terpisah). Di mesin dengan core lebih sedikit dari worker, wall time gak bakal turun.
+Shard di dalam satu proses gak dibenchmark terpisah: semuanya antre di limiter + event loop yang sama.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+
+import common
+from common import db
+
+import agenda1
+import sender
+
+
+def _worker(k, n, now, send_bound, latency, barrier, results):
+    if send_bound:
+        sender.set_rate_share(1 / n)
+    else:
+        sender.SEND_CONFIG.update(rate_per_sec=1e6, per_chat_interval=0)
+    app = common.FakeApp(common.FakeBot(latency=latency))
+    db.fetch_one("SELECT 1 AS x")  # koneksi kebuka sebelum start
+    barrier.wait()
+    cpu = time.process_time()
+    asyncio.run(agenda1._reminder_tick(app, now, (k, n)))
+    results.put((app.bot.sent, time.time(), time.process_time() - cpu))
+
+
+def seed(now, n):
+    # satu agenda per user, semua di window 5 jam -> tiap tick kirim n reminder initial
+    db.execute_query("DELETE FROM agenda_reminder")
+    db.execute_query("DELETE FROM agenda_penting")
+    db.execute_query("DELETE FROM user")
+    common.add_users(n)
+    for chunk in db.chunked([(i, f"agenda {i}", now + timedelta(hours=3)) for i in range(1, n + 1)], 10000):
+        db.execute_many(
+            "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')", chunk
+        )
+
+
+def run(ctx, now, total, workers, send_bound, latency):
+    db.execute_query("DELETE FROM agenda_reminder")  # reset state biar semua reminder kekirim lagi
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(k, workers, now, send_bound, latency, barrier, results))
+        for k in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    started = time.time()
+    done = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    sent = [chat_id for chat_ids, _, _ in done for chat_id in chat_ids]
+    assert len(sent) == total and len(set(sent)) == total, "tiap reminder harus terkirim tepat sekali"
+    return max(end for _, end, _ in done) - started, max(cpu for _, _, cpu in done)
+
+
+def scenario(ctx, title, total, workers_list, send_bound, latency):
+    now = datetime.now().replace(microsecond=0)
+    seed(now, total)
+    print(title)
+    base = None
+    for workers in workers_list:
+        elapsed, cpu = run(ctx, now, total, workers, send_bound, latency)
+        base = base or elapsed
+        print(
+            f"  workers={workers:<3} wall {elapsed:>6.2f}s {total / elapsed:>7.0f}/s ({base / elapsed:.2f}x)"
+            f"  | CPU worker terberat {cpu * 1000:>7.1f} ms"
+        )
+
+
+def main(args):
+    ctx = multiprocessing.get_context("spawn")
+    rate = sender.SEND_CONFIG["rate_per_sec"]
+    print(f"{os.cpu_count()} CPU")
+    scenario(
+        ctx, f"kirim jadi bottleneck: {args.send_reminders} reminder, limiter {rate:g}/s dibagi ke worker, "
+        f"bot latency {args.latency * 1000:.0f} ms",
+        args.send_reminders, args.workers, True, args.latency,
+    )
+    scenario(
+        ctx, f"tick DB jadi bottleneck: {args.db_reminders} reminder, limiter dibuka, bot tanpa latency (SQLite)",
+        args.db_reminders, args.workers, False, 0.0,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--send-reminders", type=int, default=125)
+    parser.add_argument("--db-reminders", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    main(parser.parse_args())
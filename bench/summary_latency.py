@@ -0,0 +1,87 @@
+"""Benchmark latency ringkasan keuangan (list_history) dengan 1M row keuangan.
+
+    python bench/summary_latency.py [--rows 1000000] [--repeat 200]
+
+Bandingin pola lama (6 query: 3 SUM + 3 "5 terakhir") dengan get_summary_and_last5 (1 query UNION ALL
+yang baca total dari keuangan_saldo).
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import common
+from common import db
+
+import keuangan
+
+USER_ID = 1  # semua row punya satu pemilik: kasus terburuk buat SUM
+
+
+async def legacy_summary(user_id):
+    """Pola lama: tiap angka query sendiri, SUM scan semua row milik user."""
+    totals = []
+    for table in ("tabungan", "pakai_tabungan", "pengeluaran"):
+        row = await db.afetch_one(f"SELECT SUM(nominal) AS total FROM {table} WHERE user_id=%s", (user_id,))
+        totals.append(int(row["total"] or 0))
+    for query in (
+        "SELECT tanggal, nominal, keterangan FROM tabungan WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5",
+        "SELECT tanggal, nominal, keterangan FROM pakai_tabungan WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5",
+        "SELECT tanggal, kategori, deskripsi, nominal FROM pengeluaran WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5",
+    ):
+        await db.afetch_all(query, (user_id,))
+    return totals
+
+
+def seed(n_rows):
+    rnd = random.Random(22)
+    base = datetime(2020, 1, 1)
+    per_table = n_rows // 3
+    tables = [
+        ("tabungan", "user_id, tanggal, nominal, keterangan",
+         lambda i: (USER_ID, base + timedelta(minutes=i), rnd.randint(1, 9) * 1000, "Nabung")),
+        ("pakai_tabungan", "user_id, tanggal, nominal, keterangan",
+         lambda i: (USER_ID, base + timedelta(minutes=i, seconds=7), 100, "jajan")),
+        ("pengeluaran", "user_id, tanggal, kategori, deskripsi, nominal",
+         lambda i: (USER_ID, base + timedelta(minutes=i, seconds=13), "makan", f"d{i}", 500)),
+    ]
+    for table, cols, make in tables:
+        ph = ", ".join(["%s"] * len(cols.split(",")))
+        for start in range(0, per_table, 10000):
+            db.execute_many(
+                f"INSERT INTO {table} ({cols}) VALUES ({ph})", [make(i) for i in range(start, min(start + 10000, per_table))]
+            )
+    # total yang biasanya di-maintain write path keuangan
+    db.execute_query(
+        "INSERT INTO keuangan_saldo (user_id, total_tabungan, total_pakai, total_pengeluaran) VALUES (%s, "
+        "(SELECT SUM(nominal) FROM tabungan WHERE user_id=%s), (SELECT SUM(nominal) FROM pakai_tabungan WHERE user_id=%s), "
+        "(SELECT SUM(nominal) FROM pengeluaran WHERE user_id=%s))",
+        (USER_ID,) * 4,
+    )
+    return per_table * 3
+
+
+async def bench(name, coro_fn, repeat):
+    db.reset_query_stats()
+    result, durations = await common.timed(coro_fn, repeat)
+    print(
+        f"{name:<22} p50 {common.percentile(durations, 50):>8.2f} ms  p95 {common.percentile(durations, 95):>8.2f} ms"
+        f"  {common.query_count() / repeat:.0f} query/panggilan"
+    )
+    return result
+
+
+async def main(args):
+    total_rows = seed(args.rows)
+    print(f"{total_rows} row keuangan (tabungan/pakai_tabungan/pengeluaran), 1 user (SQLite)")
+    totals = await bench("lama (6 query)", lambda: legacy_summary(USER_ID), max(args.repeat // 10, 5))
+    text = await bench("baru (1 query)", lambda: keuangan.get_summary_and_last5(USER_ID), args.repeat)
+    for amount in totals:
+        assert keuangan.format_rp(amount) in text, "total ringkasan harus sama dengan SUM() row mentah"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -7,6 +7,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # DB Config
 DB_CONFIG = {
+    "backend": os.getenv("DB_BACKEND", "mysql").strip().lower(),  # mysql | sqlite
     "host": os.getenv("DB_HOST"),
     "port": int(os.getenv("DB_PORT", "3306")),
     "database": os.getenv("DB_NAME"),
@@ -14,6 +15,65 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "ssl_ca": os.path.join(BASE_DIR, os.getenv("SSL_CA_PATH", "")),  # absolute path
     "ssl_verify_cert": True,
+    "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),  # detik
+    "read_timeout": int(os.getenv("DB_READ_TIMEOUT", "30")),  # detik
+    # Read replica (opsional, MySQL): "host1:3306,host2" — user/password/db/ssl sama kayak primary.
+    # fetch_* dibaca dari replica, execute/transaksi tetap ke primary.
+    "replicas": [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()],
+    # SQLite (DB_BACKEND=sqlite): path relatif ke BASE_DIR, atau URI "file:...?mode=memory&cache=shared"
+    "sqlite_path": (
+        os.getenv("SQLITE_PATH", "botreminder.db")
+        if os.getenv("SQLITE_PATH", "").startswith("file:")
+        else os.path.join(BASE_DIR, os.getenv("SQLITE_PATH", "botreminder.db"))
+    ),
+    "sqlite_busy_timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "5")),  # detik nunggu lock writer lain
 }
 
+# Connection pool (dipakai db.py)
+DB_POOL_CONFIG = {
+    "min_size": int(os.getenv("DB_POOL_MIN", "1")),
+    "max_size": int(os.getenv("DB_POOL_MAX", "10")),
+    "idle_timeout": float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),  # detik, koneksi idle di atas min_size ditutup
+    "borrow_timeout": float(os.getenv("DB_POOL_BORROW_TIMEOUT", "10")),  # detik nunggu kalau pool penuh
+    "validate_on_borrow": os.getenv("DB_POOL_VALIDATE", "1") == "1",  # ping sebelum koneksi dipinjam
+    "validate_interval": float(os.getenv("DB_POOL_VALIDATE_INTERVAL", "5")),  # skip ping kalau baru dipakai
+}
+
+# Circuit breaker: setelah N gagal koneksi beruntun, call DB langsung ditolak selama backoff
+DB_BREAKER_CONFIG = {
+    "failure_threshold": int(os.getenv("DB_BREAKER_FAILURES", "3")),
+    "backoff_base": float(os.getenv("DB_BREAKER_BACKOFF_BASE", "2")),  # detik, dobel tiap probe gagal
+    "backoff_max": float(os.getenv("DB_BREAKER_BACKOFF_MAX", "60")),
+}
+
+# Jumlah row per round trip untuk db.fetch_iter (streaming result besar)
+DB_FETCH_CHUNK_SIZE = int(os.getenv("DB_FETCH_CHUNK_SIZE", "500"))
+
+# Query di atas ambang ini (ms) dicatat ke slow-query log db.py (0 = mati)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+# Kirim pesan massal (sender.py): Telegram ngebatesin ~30 pesan/detik global & ~1 pesan/detik per chat
+SEND_CONFIG = {
+    "concurrency": int(os.getenv("SEND_CONCURRENCY", "10")),  # request send_message paralel
+    "rate_per_sec": float(os.getenv("SEND_RATE_PER_SEC", "25")),  # di bawah 30 biar ada margin
+    "per_chat_interval": float(os.getenv("SEND_PER_CHAT_INTERVAL", "1")),  # detik
+    "max_retries": int(os.getenv("SEND_MAX_RETRIES", "3")),  # buat RetryAfter / error network
+}
+
+# Leader election (leader.py): cuma satu instance yang jalanin reminder_loop & cron mood
+LEADER_CONFIG = {
+    "lease_ttl": float(os.getenv("LEADER_LEASE_TTL", "30")),  # detik; standby ngambil alih maks ~ttl + renew
+    "renew_interval": float(os.getenv("LEADER_RENEW_INTERVAL", "10")),  # detik antar heartbeat
+}
+
+# Worker reminder dipecah per shard: worker k pegang agenda dengan user_id % shards == k.
+# shard_ids kosong = dibagi otomatis antar instance lewat lease; diisi (mis. "0,2") = pembagian statis
+REMINDER_SHARD_CONFIG = {
+    "shards": max(1, int(os.getenv("REMINDER_SHARDS", "1"))),
+    "shard_ids": [int(k) for k in os.getenv("REMINDER_SHARD_IDS", "").split(",") if k.strip()],
+}
+
+# Data keuangan lama (sebelum per user) diklaim user Telegram ini waktu migrasi v8; 0 = gak ada yang punya
+KEUANGAN_LEGACY_OWNER = int(os.getenv("KEUANGAN_LEGACY_OWNER", "0") or 0)
+
 TELEGRAM_API_KEY = os.getenv("TELEGRAM_API_KEY", "").strip()
@@ -1,73 +1,1326 @@
 # db.py
-import mysql.connector
-from mysql.connector import Error
-from config import DB_CONFIG
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import functools
+import itertools
+import re
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-def get_connection():
-    """Bikin koneksi ke database."""
+import sqlite3
+from datetime import date, datetime
+
+from config import DB_BREAKER_CONFIG, DB_CONFIG, DB_POOL_CONFIG, DB_SLOW_QUERY_MS, DB_FETCH_CHUNK_SIZE
+
+try:
+    import mysql.connector
+    from mysql.connector import Error as MySQLError
+except ImportError:  # backend sqlite gak butuh driver MySQL
+    mysql = None
+    MySQLError = None
+
+
+class DatabaseError(Exception):
+    """Error dari layer db.py sendiri (bukan dari driver)."""
+
+    def __init__(self, msg=None):
+        super().__init__(msg)
+        self.msg = msg
+
+
+class PoolTimeout(DatabaseError):
+    """Semua koneksi di pool lagi dipakai dan borrow_timeout kelewat."""
+
+
+class CircuitOpen(DatabaseError):
+    """Circuit breaker lagi open: DB dianggap down, call langsung ditolak tanpa nyoba konek."""
+
+
+# Semua error DB yang ditangkap helper (driver apapun yang aktif)
+DB_ERRORS = tuple(e for e in (DatabaseError, sqlite3.Error, MySQLError) if e is not None)
+
+
+def _close_quietly(conn):
     try:
-        conn = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"],
-            database=DB_CONFIG["database"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            ssl_ca=DB_CONFIG["ssl_ca"],
-            ssl_verify_cert=DB_CONFIG["ssl_verify_cert"]
+        conn.close()
+    except Exception:
+        pass
+
+
+# ===== Storage backends =====
+class MySQLBackend:
+    """MySQL via mysql-connector (TLS pakai ssl_ca dari config)."""
+
+    name = "mysql"
+
+    def __init__(self, config):
+        if mysql is None:
+            raise DatabaseError("mysql-connector-python belum ke-install (DB_BACKEND=mysql)")
+        self.config = config
+
+    def connect(self):
+        """Buka koneksi baru ke database (raise kalau gagal)."""
+        cfg = self.config
+        return mysql.connector.connect(
+            host=cfg["host"],
+            port=cfg["port"],
+            database=cfg["database"],
+            user=cfg["user"],
+            password=cfg["password"],
+            ssl_ca=cfg["ssl_ca"],
+            ssl_verify_cert=cfg["ssl_verify_cert"],
+            connection_timeout=cfg["connect_timeout"],
+            read_timeout=cfg["read_timeout"],
+            # koneksi di-pool: autocommit biar SELECT gak nahan snapshot lama,
+            # transaksi multi-statement dibuka eksplisit lewat transaction()
+            autocommit=True,
         )
+
+    def ping(self, conn):
+        """Cek koneksi masih hidup (raise kalau putus)."""
+        conn.ping(reconnect=False)
+
+    def translate(self, query):
+        return query
+
+    def dict_cursor(self, conn):
+        return conn.cursor(dictionary=True)
+
+    def stream_cursor(self, conn):
+        # unbuffered: row di-stream dari server pas fetchmany, gak ditampung semua di client
+        return conn.cursor(dictionary=True, buffered=False)
+
+    def tuple_cursor(self, conn):
+        return conn.cursor()
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def begin(self, conn):
+        conn.start_transaction()
+
+
+# --- dialect MySQL -> SQLite (cuma konstruksi yang dipakai modul fitur) ---
+# sama persis kayak mysql-connector: cuma %s yang diganti, %% dikirim apa adanya
+# (query yang salah di MySQL harus salah juga di SQLite)
+_RE_SQ_PARAM = re.compile(r"%s")
+_RE_SQ_INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE)
+_RE_SQ_UPSERT = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_RE_SQ_VALUES_FN = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.IGNORECASE)
+_RE_SQ_NOW = re.compile(r"\bNOW\s*\(\s*\)", re.IGNORECASE)
+_RE_SQ_NOW_INTERVAL = re.compile(r"\bNOW\s*\(\s*\)\s*([+-])\s*INTERVAL\s+(\?|\d+(?:\.\d+)?)\s+SECOND\b", re.IGNORECASE)
+# argumen boleh berisi satu level kurung, mis. YEAR(NOW()) yang udah jadi YEAR(datetime('now', 'localtime'))
+_RE_SQ_YEAR = re.compile(r"\bYEAR\s*\(((?:[^()]|\([^()]*\))+)\)", re.IGNORECASE)
+_RE_SQ_MONTH = re.compile(r"\bMONTH\s*\(((?:[^()]|\([^()]*\))+)\)", re.IGNORECASE)
+_RE_SQ_TRUNCATE = re.compile(r"\bTRUNCATE\s+TABLE\b", re.IGNORECASE)
+_RE_SQ_CONCAT = re.compile(r"\bCONCAT\s*\(([^()]*)\)", re.IGNORECASE)
+_RE_SQ_MOD = re.compile(r"\bMOD\s*\(([^(),]+),([^(),]+)\)", re.IGNORECASE)
+_RE_SQ_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+
+
+def _split_args(text):
+    """Pecah argumen fungsi SQL di koma yang gak di dalam string."""
+    args, buf, quote = [], [], None
+    for ch in text:
+        if quote:
+            buf.append(ch)
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+            buf.append(ch)
+        elif ch == ",":
+            args.append("".join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+    args.append("".join(buf).strip())
+    return args
+
+
+@functools.lru_cache(maxsize=1024)
+def mysql_to_sqlite(query):
+    """Terjemahin query dialek MySQL ke SQLite: placeholder, INSERT IGNORE, upsert, NOW(), YEAR()/MONTH(), dll."""
+    q = _RE_SQ_PARAM.sub("?", query)
+    q = _RE_SQ_INSERT_IGNORE.sub("INSERT OR IGNORE", q)
+    if _RE_SQ_UPSERT.search(q):
+        # ON DUPLICATE KEY UPDATE a=VALUES(a) -> ON CONFLICT DO UPDATE SET a=excluded.a
+        q = _RE_SQ_UPSERT.sub("ON CONFLICT DO UPDATE SET", q)
+        head, tail = q.split("ON CONFLICT DO UPDATE SET", 1)
+        q = head + "ON CONFLICT DO UPDATE SET" + _RE_SQ_VALUES_FN.sub(r"excluded.\1", tail)
+    # NOW() +/- INTERVAL n SECOND -> modifier datetime() ('+30 seconds')
+    q = _RE_SQ_NOW_INTERVAL.sub(lambda m: f"datetime('now', 'localtime', '{m.group(1)}' || {m.group(2)} || ' seconds')", q)
+    q = _RE_SQ_NOW.sub("datetime('now', 'localtime')", q)
+    q = _RE_SQ_YEAR.sub(r"CAST(strftime('%Y', \1) AS INTEGER)", q)
+    q = _RE_SQ_MONTH.sub(r"CAST(strftime('%m', \1) AS INTEGER)", q)
+    q = _RE_SQ_TRUNCATE.sub("DELETE FROM", q)
+    q = _RE_SQ_CONCAT.sub(lambda m: "(" + " || ".join(_split_args(m.group(1))) + ")", q)
+    # mod() bawaan SQLite (kalau ada) balikin REAL; % tetap integer
+    q = _RE_SQ_MOD.sub(lambda m: f"({m.group(1).strip()} % {m.group(2).strip()})", q)
+    q = _RE_SQ_FOR_UPDATE.sub("", q)
+    return q
+
+
+def _sqlite_dict_row(cursor, row):
+    return {col[0]: val for col, val in zip(cursor.description, row)}
+
+
+def _adapt_datetime(val):
+    # simpan naive wall-clock kayak kolom DATETIME MySQL
+    return val.replace(tzinfo=None).isoformat(sep=" ")
+
+
+def _convert_datetime(raw):
+    return datetime.fromisoformat(raw.decode())
+
+
+def _convert_date(raw):
+    return date.fromisoformat(raw.decode()[:10])
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda val: val.isoformat())
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_datetime)
+sqlite3.register_converter("DATE", _convert_date)
+
+
+class SQLiteBackend:
+    """SQLite embedded (WAL) buat offline run, benchmark, dan deploy single-node."""
+
+    name = "sqlite"
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config["sqlite_path"]
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.config["sqlite_busy_timeout"],
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,  # autocommit; transaksi eksplisit lewat begin()
+            check_same_thread=False,  # koneksi pindah-pindah thread lewat pool (dipakai satu thread per pinjam)
+            uri=self.path.startswith("file:"),
+        )
+        conn.row_factory = _sqlite_dict_row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
         return conn
-    except Error as e:
+
+    def ping(self, conn):
+        conn.execute("SELECT 1").fetchall()
+
+    def translate(self, query):
+        return mysql_to_sqlite(query)
+
+    def dict_cursor(self, conn):
+        return conn.cursor()
+
+    def stream_cursor(self, conn):
+        # cursor SQLite memang lazy: row diambil dari file pas fetchmany
+        return conn.cursor()
+
+    def tuple_cursor(self, conn):
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def begin(self, conn):
+        # IMMEDIATE: ambil write lock di awal, biar gak deadlock pas upgrade read -> write
+        conn.execute("BEGIN IMMEDIATE")
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Backend aktif sesuai DB_CONFIG["backend"]."""
+    global _backend
+    if _backend is None:
+        name = (DB_CONFIG.get("backend") or "mysql").lower()
+        if name not in BACKENDS:
+            raise DatabaseError(f"DB_BACKEND tidak dikenal: {name}")
+        _backend = BACKENDS[name](DB_CONFIG)
+    return _backend
+
+
+def get_connection():
+    """Bikin koneksi ke database."""
+    try:
+        return get_backend().connect()
+    except DB_ERRORS as e:
         print(f"[DB ERROR] Gagal konek ke DB: {e}")
         return None
 
-def fetch_all(query, params=None):
-    """Ambil banyak data dari DB."""
-    conn = get_connection()
-    if not conn:
-        return []
+
+# ===== Connection pool =====
+class ConnectionPool:
+    """Pool koneksi thread-safe: min/max size, idle eviction, ping sebelum dipinjam, plus counter metrik."""
+
+    def __init__(self, connect, ping=None, min_size=1, max_size=10, idle_timeout=300.0,
+                 borrow_timeout=10.0, validate_on_borrow=True, validate_interval=0.0):
+        if max_size < 1:
+            raise ValueError("max_size minimal 1")
+        self._connect = connect
+        self._ping = ping
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.borrow_timeout = borrow_timeout
+        self.validate_on_borrow = validate_on_borrow and ping is not None
+        # koneksi yang baru nganggur < validate_interval detik gak perlu di-ping lagi
+        self.validate_interval = validate_interval
+
+        self._idle = deque()  # (conn, last_used) — kanan = paling baru dipakai
+        self._size = 0  # semua koneksi hidup (idle + dipinjam)
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "evicted_idle": 0,
+            "validation_failures": 0,
+            "borrows": 0,
+            "exhausted": 0,
+            "timeouts": 0,
+            "borrow_wait_total_ms": 0.0,
+            "borrow_wait_max_ms": 0.0,
+        }
+
+    # --- internal ---
+    def _take_expired_locked(self, now):
+        """Ambil koneksi idle yang kelamaan nganggur (tetap sisakan min_size)."""
+        expired = []
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats["evicted_idle"] += 1
+            self._stats["closed"] += 1
+            expired.append(conn)
+        return expired
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        _close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+
+    def _record_wait(self, started):
+        waited_ms = (time.monotonic() - started) * 1000
+        with self._cond:
+            self._stats["borrows"] += 1
+            self._stats["borrow_wait_total_ms"] += waited_ms
+            if waited_ms > self._stats["borrow_wait_max_ms"]:
+                self._stats["borrow_wait_max_ms"] = waited_ms
+
+    # --- public ---
+    def warmup(self):
+        """Isi pool sampai min_size koneksi idle."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            self.release(conn)
+
+    def acquire(self):
+        """Pinjam koneksi; tunggu maksimal borrow_timeout kalau pool penuh."""
+        started = time.monotonic()
+        deadline = started + self.borrow_timeout
+        counted_exhausted = False
+        while True:
+            conn = None
+            last_used = 0.0
+            create = False
+            with self._cond:
+                while True:
+                    expired = self._take_expired_locked(time.monotonic())
+                    if expired:
+                        break
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    if not counted_exhausted:
+                        self._stats["exhausted"] += 1
+                        counted_exhausted = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"Pool habis ({self.max_size} koneksi), timeout {self.borrow_timeout}s")
+                    self._cond.wait(remaining)
+
+            if conn is None and not create:
+                # ada koneksi idle kadaluarsa: tutup di luar lock lalu coba lagi
+                for old in expired:
+                    _close_quietly(old)
+                continue
+
+            if create:
+                conn = self._open()
+            elif self.validate_on_borrow and time.monotonic() - last_used >= self.validate_interval:
+                try:
+                    self._ping(conn)
+                except Exception:
+                    with self._cond:
+                        self._stats["validation_failures"] += 1
+                    self._discard(conn)
+                    continue
+
+            self._record_wait(started)
+            return conn
+
+    def release(self, conn, discard=False):
+        """Balikin koneksi ke pool (atau tutup kalau discard=True)."""
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager: pinjam koneksi, balikin otomatis (koneksi rusak dibuang)."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    def close_all(self):
+        """Tutup semua koneksi idle."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats["closed"] += len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    def stats(self):
+        """Snapshot metrik pool."""
+        with self._cond:
+            snap = dict(self._stats)
+            snap["size"] = self._size
+            snap["idle"] = len(self._idle)
+            snap["in_use"] = self._size - len(self._idle)
+            snap["min_size"] = self.min_size
+            snap["max_size"] = self.max_size
+        borrows = snap["borrows"]
+        snap["borrow_wait_avg_ms"] = snap["borrow_wait_total_ms"] / borrows if borrows else 0.0
+        return snap
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool global (dibikin lazy pas query pertama)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                backend = get_backend()
+                pool = ConnectionPool(
+                    backend.connect,
+                    ping=backend.ping,
+                    min_size=DB_POOL_CONFIG["min_size"],
+                    max_size=DB_POOL_CONFIG["max_size"],
+                    idle_timeout=DB_POOL_CONFIG["idle_timeout"],
+                    borrow_timeout=DB_POOL_CONFIG["borrow_timeout"],
+                    validate_on_borrow=DB_POOL_CONFIG["validate_on_borrow"],
+                    validate_interval=DB_POOL_CONFIG["validate_interval"],
+                )
+                try:
+                    pool.warmup()
+                except DB_ERRORS as e:
+                    if _is_connection_error(e):
+                        breaker.record_failure()
+                    print(f"[DB ERROR] Gagal konek ke DB: {e}")
+                _pool = pool
+    return _pool
+
+
+# --- read replica (opsional, cuma MySQL): SELECT biasa dibaca dari sini, write tetap ke primary ---
+class ReplicaSet:
+    """Daftar backend replica; tiap koneksi baru dibuka round-robin, skip replica yang gak bisa dihubungi."""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self._next = itertools.count()
+
+    def connect(self):
+        start = next(self._next)
+        last_error = None
+        for i in range(len(self.backends)):
+            backend = self.backends[(start + i) % len(self.backends)]
+            try:
+                return backend.connect()
+            except DB_ERRORS as e:
+                last_error = e
+        raise last_error
+
+    def ping(self, conn):
+        self.backends[0].ping(conn)
+
+
+def _parse_host(raw, default_port):
+    host, _, port = raw.rpartition(":") if ":" in raw else (raw, "", "")
+    return host, int(port) if port else default_port
+
+
+_replicas = None
+_replica_pool = None
+
+
+def _get_replicas():
+    global _replicas
+    if _replicas is None:
+        hosts = DB_CONFIG.get("replicas") or []
+        backend = get_backend()
+        if hosts and backend.name != "mysql":
+            print(f"[DB WARN] DB_REPLICA_HOSTS diabaikan untuk backend {backend.name}")
+            hosts = []
+        backends = []
+        for raw in hosts:
+            host, port = _parse_host(raw, DB_CONFIG["port"])
+            backends.append(type(backend)({**DB_CONFIG, "host": host, "port": port}))
+        _replicas = ReplicaSet(backends)
+    return _replicas
+
+
+def has_replicas():
+    """True kalau ada read replica yang dikonfigurasi (DB_REPLICA_HOSTS)."""
+    return bool(_get_replicas().backends)
+
+
+def get_replica_pool():
+    """Pool koneksi ke read replica (lazy); None kalau gak ada replica."""
+    global _replica_pool
+    if _replica_pool is None and has_replicas():
+        with _pool_lock:
+            if _replica_pool is None:
+                replicas = _get_replicas()
+                pool = ConnectionPool(
+                    replicas.connect,
+                    ping=replicas.ping,
+                    min_size=DB_POOL_CONFIG["min_size"],
+                    max_size=DB_POOL_CONFIG["max_size"],
+                    idle_timeout=DB_POOL_CONFIG["idle_timeout"],
+                    borrow_timeout=DB_POOL_CONFIG["borrow_timeout"],
+                    validate_on_borrow=DB_POOL_CONFIG["validate_on_borrow"],
+                    validate_interval=DB_POOL_CONFIG["validate_interval"],
+                )
+                try:
+                    pool.warmup()
+                except DB_ERRORS as e:
+                    print(f"[DB ERROR] Gagal konek ke replica: {e}")
+                _replica_pool = pool
+    return _replica_pool
+
+
+def pool_stats(replica=False):
+    """Counter pool: created, exhausted, borrow wait (ms), dll. replica=True -> pool read replica."""
+    if replica:
+        pool = get_replica_pool()
+        return pool.stats() if pool else None
+    return get_pool().stats()
+
+
+# ===== Circuit breaker =====
+# Error level koneksi (server gak bisa dihubungi / koneksi putus) — error query biasa gak dihitung.
+_MYSQL_CONNECTION_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+
+def _is_connection_error(exc):
+    if isinstance(exc, (CircuitOpen, PoolTimeout)):
+        return False
+    if getattr(exc, "errno", None) in _MYSQL_CONNECTION_ERRNOS:
+        return True
+    if mysql is not None and isinstance(exc, mysql.connector.errors.InterfaceError):
+        return True
+    return isinstance(exc, sqlite3.OperationalError) and "unable to open" in str(exc)
+
+
+class CircuitBreaker:
+    """closed -> (gagal beruntun >= threshold) -> open -> (tunggu backoff) -> half_open -> 1 probe -> closed/open.
+
+    Backoff open naik eksponensial tiap probe gagal (base * 2^n, maks backoff_max).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, backoff_base=2.0, backoff_max=60.0, name="primary"):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0  # gagal beruntun di state closed
+        self._reopens = 0  # probe gagal beruntun (buat backoff)
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._outage_started = None  # wall clock pertama kali open
+        self._stats = {
+            "trips": 0,
+            "fast_failures": 0,
+            "probes": 0,
+            "probe_failures": 0,
+            "recoveries": 0,
+            "last_outage_seconds": None,
+            "total_outage_seconds": 0.0,
+        }
+
+    def _open_locked(self, now):
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** self._reopens))
+        self._state = self.OPEN
+        self._open_until = now + backoff
+        if self._outage_started is None:
+            self._outage_started = time.time()
+            self._stats["trips"] += 1
+        print(f"[DB BREAKER] {self.name} open, coba lagi dalam {backoff:.1f}s")
+
+    def allow(self):
+        """Cek sebelum pinjam koneksi. Balikin True kalau call ini probe half-open; raise CircuitOpen kalau ditolak."""
+        if self._state == self.CLOSED:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.OPEN and now >= self._open_until:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._stats["probes"] += 1
+                return True
+            self._stats["fast_failures"] += 1
+        raise CircuitOpen("DB lagi gak bisa dihubungi (circuit breaker open)")
+
+    def record_success(self, probe=False):
+        if self._state == self.CLOSED and self._failures == 0 and not probe:
+            return
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                outage = time.time() - self._outage_started if self._outage_started else 0.0
+                self._stats["recoveries"] += 1
+                self._stats["last_outage_seconds"] = round(outage, 3)
+                self._stats["total_outage_seconds"] += outage
+                print(f"[DB BREAKER] {self.name} closed lagi, DB pulih setelah {outage:.1f}s")
+            self._state = self.CLOSED
+            self._reopens = 0
+            self._probe_in_flight = False
+            self._outage_started = None
+
+    def record_failure(self, probe=False):
+        now = time.monotonic()
+        with self._lock:
+            if probe or self._state == self.HALF_OPEN:
+                self._stats["probe_failures"] += 1
+                self._reopens += 1
+                self._probe_in_flight = False
+                self._open_locked(now)
+                return
+            if self._state == self.OPEN:
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open_locked(now)
+
+    @property
+    def state(self):
+        return self._state
+
+    def is_degraded(self):
+        """True kalau call sekarang bakal langsung ditolak (open & belum waktunya probe)."""
+        return self._state == self.OPEN and time.monotonic() < self._open_until
+
+    def retry_in(self):
+        """Detik sampai probe berikutnya boleh jalan (0 kalau gak open)."""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            snap = dict(self._stats)
+            snap["state"] = self._state
+            snap["consecutive_failures"] = self._failures
+            snap["retry_in_seconds"] = round(self.retry_in(), 3)
+            snap["outage_seconds"] = (
+                round(time.time() - self._outage_started, 3) if self._outage_started else 0.0
+            )
+        return snap
+
+
+breaker = CircuitBreaker(
+    failure_threshold=DB_BREAKER_CONFIG["failure_threshold"],
+    backoff_base=DB_BREAKER_CONFIG["backoff_base"],
+    backoff_max=DB_BREAKER_CONFIG["backoff_max"],
+)
+# breaker terpisah buat replica: replica down cuma bikin read pindah ke primary, bot gak dianggap degraded
+replica_breaker = CircuitBreaker(
+    failure_threshold=DB_BREAKER_CONFIG["failure_threshold"],
+    backoff_base=DB_BREAKER_CONFIG["backoff_base"],
+    backoff_max=DB_BREAKER_CONFIG["backoff_max"],
+    name="replica",
+)
+
+
+def is_degraded():
+    """DB lagi dianggap down (circuit breaker open) — fitur cukup bales "coba lagi nanti"."""
+    return breaker.is_degraded()
+
+
+def breaker_stats(replica=False):
+    """State & counter circuit breaker (trips, fast_failures, last_outage_seconds, dll)."""
+    return (replica_breaker if replica else breaker).stats()
+
+
+def _route(replica):
+    return (get_replica_pool, replica_breaker) if replica else (get_pool, breaker)
+
+
+@contextmanager
+def _borrow(replica=False):
+    """Pinjam koneksi pool (primary / replica) lewat circuit breaker-nya; error koneksi dihitung ke breaker."""
+    get, cb = _route(replica)
+    probe = cb.allow()
+    failed = False
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        result = cursor.fetchall()
-        return result
-    except Error as e:
-        print(f"[DB ERROR] Query gagal: {e}")
-        return []
+        with get().connection() as conn:
+            yield conn
+    except DB_ERRORS as e:
+        failed = _is_connection_error(e)
+        raise
     finally:
-        cursor.close()
-        conn.close()
+        # error non-koneksi (atau exception dari kode caller) tetap nutup probe biar gak nyangkut
+        if failed:
+            cb.record_failure(probe)
+        else:
+            cb.record_success(probe)
 
-def fetch_one(query, params=None):
-    """Ambil satu data dari DB."""
-    conn = get_connection()
-    if not conn:
-        return None
+
+def _replica_unavailable(e):
+    return isinstance(e, CircuitOpen) or _is_connection_error(e)
+
+
+def _read(func, primary=False):
+    """Jalankan func(conn) buat SELECT: ke replica kalau ada, fallback ke primary kalau replica down.
+
+    primary=True buat read-your-writes (baca balik row yang barusan ditulis, replica bisa lag).
+    """
+    if not primary and has_replicas():
+        try:
+            with _borrow(replica=True) as conn:
+                return func(conn)
+        except DB_ERRORS as e:
+            if not _replica_unavailable(e):
+                raise
+            if not isinstance(e, CircuitOpen):
+                print(f"[DB WARN] Replica gagal, baca dari primary: {e}")
+    with _borrow() as conn:
+        return func(conn)
+
+
+def _log_error(e, what="Query gagal"):
+    # CircuitOpen sengaja diem: bisa ribuan per menit pas DB down, state-nya udah di-print breaker
+    if not isinstance(e, CircuitOpen):
+        print(f"[DB ERROR] {what}: {e}")
+
+
+# ===== Query instrumentation =====
+# Latency & jumlah call per statement (teks dinormalisasi), plus log query lambat dengan pemanggilnya.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLOW_LOG_SIZE = 100
+
+_query_stats = {}
+_slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+_stats_lock = threading.Lock()
+# pemanggil asli dari API async (di thread executor frame handler-nya udah gak kelihatan)
+_caller_var = contextvars.ContextVar("db_caller", default=None)
+_SKIP_FILES = {__file__, contextlib.__file__}
+
+_RE_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"%s|%\(\w+\)s|\?")
+_RE_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_RE_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_RE_SPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query):
+    """Samain statement yang cuma beda literal/params: literal & placeholder jadi ?, IN (...) & multi-row VALUES diringkas."""
+    q = _RE_STRING.sub("?", query)
+    q = _RE_NUMBER.sub("?", q)
+    q = _RE_PARAM.sub("?", q)
+    q = _RE_IN_LIST.sub("IN (...)", q)
+    q = _RE_VALUES_ROWS.sub(r"\1, ...", q)
+    return _RE_SPACES.sub(" ", q).strip().rstrip(";")
+
+
+def _caller():
+    """module.function pertama di luar db.py yang manggil query."""
+    caller = _caller_var.get()
+    if caller:
+        return caller
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename in _SKIP_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def _observe(query, elapsed_ms, ok):
+    key = normalize_query(query)
+    bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+    with _stats_lock:
+        st = _query_stats.get(key)
+        if st is None:
+            st = _query_stats[key] = {
+                "calls": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        st["calls"] += 1
+        st["total_ms"] += elapsed_ms
+        st["buckets"][bucket] += 1
+        if elapsed_ms > st["max_ms"]:
+            st["max_ms"] = elapsed_ms
+        if not ok:
+            st["errors"] += 1
+
+    threshold = DB_SLOW_QUERY_MS
+    if threshold and elapsed_ms >= threshold:
+        caller = _caller()
+        with _stats_lock:
+            _slow_queries.append({
+                "query": key,
+                "elapsed_ms": round(elapsed_ms, 2),
+                "caller": caller,
+                "at": time.time(),
+            })
+        print(f"[DB SLOW] {elapsed_ms:.1f} ms di {caller}: {key[:200]}")
+
+
+@contextmanager
+def _track(query):
+    started = time.perf_counter()
+    ok = False
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        result = cursor.fetchone()
-        return result
-    except Error as e:
-        print(f"[DB ERROR] Query gagal: {e}")
+        yield
+        ok = True
+    finally:
+        _observe(query, (time.perf_counter() - started) * 1000, ok)
+
+
+def _percentile(buckets, calls, pct):
+    """Perkiraan persentil dari histogram (batas atas bucket)."""
+    target = calls * pct
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= target:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+    return float("inf")
+
+
+def query_stats(top=None, order_by="total_ms"):
+    """Snapshot statistik per statement, diurutkan (default: total waktu terbesar dulu)."""
+    with _stats_lock:
+        items = [(q, dict(st, buckets=list(st["buckets"]))) for q, st in _query_stats.items()]
+    result = []
+    for q, st in items:
+        calls = st["calls"]
+        result.append({
+            "query": q,
+            "calls": calls,
+            "errors": st["errors"],
+            "total_ms": round(st["total_ms"], 2),
+            "avg_ms": round(st["total_ms"] / calls, 2) if calls else 0.0,
+            "max_ms": round(st["max_ms"], 2),
+            "p50_ms": _percentile(st["buckets"], calls, 0.50),
+            "p95_ms": _percentile(st["buckets"], calls, 0.95),
+            "p99_ms": _percentile(st["buckets"], calls, 0.99),
+            "histogram": dict(zip([f"<={b}" for b in LATENCY_BUCKETS_MS] + ["inf"], st["buckets"])),
+        })
+    result.sort(key=lambda r: r[order_by], reverse=True)
+    return result[:top] if top else result
+
+
+def slow_queries():
+    """Daftar query lambat terakhir (maks SLOW_LOG_SIZE), paling baru di akhir."""
+    with _stats_lock:
+        return list(_slow_queries)
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _query_stats.clear()
+        _slow_queries.clear()
+
+
+# ===== Row modes =====
+# "dict"   : dict per row (default, kompatibel sama kode lama)
+# "record" : tuple ringan (namedtuple + __slots__), tipe dibikin sekali per set kolom.
+#            Tetap bisa row["kolom"] / row.get("kolom") / row.kolom, tapi tanpa dict + key string per row.
+ROW_MODES = ("dict", "record")
+
+
+@functools.lru_cache(maxsize=256)
+def record_type(columns):
+    """Tipe record untuk tuple nama kolom ``columns`` (di-cache, jadi cuma dibikin sekali)."""
+    base = namedtuple("Record", columns, rename=True)
+    index = {name: i for i, name in enumerate(columns)}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def keys(self):
+        return columns
+
+    return type("Record", (base,), {
+        "__slots__": (),
+        "__getitem__": __getitem__,
+        "get": get,
+        "keys": keys,
+    })
+
+
+def _open_cursor(backend, conn, rows, stream=False):
+    if rows == "dict":
+        return backend.stream_cursor(conn) if stream else backend.dict_cursor(conn)
+    if rows == "record":
+        return backend.tuple_cursor(conn)
+    raise ValueError(f"rows harus salah satu dari {ROW_MODES}, bukan {rows!r}")
+
+
+def _row_converter(cursor, rows):
+    """Fungsi list row mentah -> list row sesuai mode (None = gak perlu konversi)."""
+    if rows == "dict":
         return None
+    make = functools.partial(tuple.__new__, record_type(tuple(col[0] for col in cursor.description)))
+    return lambda raw: list(map(make, raw))
+
+
+# ===== Cursor helpers (dipakai helper global & Transaction) =====
+def _cursor_fetch_all(conn, query, params, rows="dict"):
+    backend = get_backend()
+    cursor = _open_cursor(backend, conn, rows)
+    try:
+        with _track(query):
+            cursor.execute(backend.translate(query), params or ())
+            result = cursor.fetchall()
+            convert = _row_converter(cursor, rows)
+            return convert(result) if convert else result
     finally:
         cursor.close()
-        conn.close()
+
+
+def _cursor_fetch_one(conn, query, params, rows="dict"):
+    backend = get_backend()
+    cursor = _open_cursor(backend, conn, rows)
+    try:
+        with _track(query):
+            cursor.execute(backend.translate(query), params or ())
+            result = cursor.fetchone()
+            cursor.fetchall()  # buang sisa row biar koneksi bisa dipakai lagi
+            convert = _row_converter(cursor, rows)
+            return convert([result])[0] if convert and result is not None else result
+    finally:
+        cursor.close()
+
+
+def _cursor_execute(conn, query, params):
+    backend = get_backend()
+    cursor = backend.cursor(conn)
+    try:
+        with _track(query):
+            cursor.execute(backend.translate(query), params or ())
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _cursor_insert(conn, query, params):
+    """INSERT satu row, balikin id AUTO_INCREMENT yang dibuat (cursor.lastrowid, per koneksi -> aman paralel)."""
+    backend = get_backend()
+    cursor = backend.cursor(conn)
+    try:
+        with _track(query):
+            cursor.execute(backend.translate(query), params or ())
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+def _cursor_execute_many(conn, query, seq_params):
+    backend = get_backend()
+    cursor = backend.cursor(conn)
+    try:
+        with _track(query):
+            cursor.executemany(backend.translate(query), seq_params)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def fetch_all(query, params=None, rows="dict", primary=False):
+    """Ambil banyak data dari DB (replica kalau ada). rows="record" -> tuple ringan, bukan dict."""
+    try:
+        return _read(lambda conn: _cursor_fetch_all(conn, query, params, rows), primary)
+    except DB_ERRORS as e:
+        _log_error(e)
+        return []
+
+
+def fetch_one(query, params=None, rows="dict", primary=False):
+    """Ambil satu data dari DB (replica kalau ada; primary=True buat read-your-writes)."""
+    try:
+        return _read(lambda conn: _cursor_fetch_one(conn, query, params, rows), primary)
+    except DB_ERRORS as e:
+        _log_error(e)
+        return None
+
 
 def execute_query(query, params=None):
     """Jalankan INSERT/UPDATE/DELETE ke DB."""
-    conn = get_connection()
-    if not conn:
+    try:
+        with _borrow() as conn:
+            _cursor_execute(conn, query, params)
+            conn.commit()
+            return True
+    except DB_ERRORS as e:
+        _log_error(e)
+        return False
+
+
+def execute_insert(query, params=None):
+    """Jalankan INSERT satu row, balikin id yang dibuat (None kalau gagal). Jangan pakai buat INSERT IGNORE."""
+    try:
+        with _borrow() as conn:
+            row_id = _cursor_insert(conn, query, params)
+            conn.commit()
+            return row_id
+    except DB_ERRORS as e:
+        _log_error(e)
+        return None
+
+
+def execute_many(query, seq_params):
+    """Jalankan satu statement untuk banyak set params (batch INSERT/UPDATE) di satu koneksi, commit sekali."""
+    seq_params = list(seq_params)
+    if not seq_params:
+        return True
+    try:
+        with transaction() as tx:
+            tx.execute_many(query, seq_params)
+        return True
+    except DB_ERRORS as e:
+        _log_error(e)
         return False
+
+
+def execute_batch(statements):
+    """Jalankan beberapa (query, params) berurutan dalam satu transaksi; semua sukses atau semua batal."""
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params or ())
-        conn.commit()
+        with transaction() as tx:
+            for query, params in statements:
+                tx.execute(query, params)
         return True
-    except Error as e:
-        print(f"[DB ERROR] Query gagal: {e}")
-        conn.rollback()
+    except DB_ERRORS as e:
+        _log_error(e)
         return False
+
+
+# ===== Helper statement multi-row =====
+# row per statement multi-row: jaga ukuran packet MySQL & limit 999 variabel SQLite lama (200 x 4 kolom)
+BATCH_ROWS = 200
+
+
+def chunked(seq, size=BATCH_ROWS):
+    """Potong list jadi potongan maksimal size item."""
+    seq = list(seq)
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def sql_in(values):
+    """Placeholder buat IN (...): sql_in([1, 2, 3]) -> "%s, %s, %s"."""
+    return ", ".join(["%s"] * len(values))
+
+
+def sql_values(rows):
+    """Placeholder + params flat buat INSERT multi-row: [(1, "a"), (2, "b")] -> ("(%s, %s), (%s, %s)", [1, "a", 2, "b"])."""
+    rows = list(rows)
+    if not rows:
+        return "", []
+    row_ph = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    params = [v for row in rows for v in row]
+    return ", ".join([row_ph] * len(rows)), params
+
+
+def _acquire_read(primary=False):
+    """Pinjam koneksi buat streaming read: replica dulu (kalau ada), fallback ke primary.
+
+    Balikin (pool, breaker, probe, conn); raise error terakhir kalau semua gagal.
+    """
+    routes = [False] if primary or not has_replicas() else [True, False]
+    for replica in routes:
+        get, cb = _route(replica)
+        try:
+            probe = cb.allow()
+        except CircuitOpen:
+            if not replica:
+                raise
+            continue
+        try:
+            pool = get()
+            return pool, cb, probe, pool.acquire()
+        except DB_ERRORS as e:
+            if _is_connection_error(e):
+                cb.record_failure(probe)
+            else:
+                cb.record_success(probe)
+            if not replica or not _is_connection_error(e):
+                raise
+            print(f"[DB WARN] Replica gagal, baca dari primary: {e}")
+
+
+def _iter_chunks(query, params=None, chunk_size=DB_FETCH_CHUNK_SIZE, rows="dict", primary=False):
+    """Generator list row per chunk dari cursor streaming; koneksi dipegang sampai habis/ditutup."""
+    try:
+        pool, cb, probe, conn = _acquire_read(primary)
+    except DB_ERRORS as e:
+        _log_error(e, "Gagal konek ke DB")
+        return
+    backend = get_backend()
+    drained = False
+    cursor = None
+    try:
+        cursor = _open_cursor(backend, conn, rows, stream=True)
+        with _track(query):
+            cursor.execute(backend.translate(query), params or ())
+        # query udah jalan = DB hidup; dicatat sekarang biar probe gak nyangkut kalau caller break di tengah
+        cb.record_success(probe)
+        probe = False
+        convert = _row_converter(cursor, rows)
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield convert(chunk) if convert else chunk
+        drained = True
+    except DB_ERRORS as e:
+        if _is_connection_error(e):
+            cb.record_failure(probe)
+        else:
+            cb.record_success(probe)
+        _log_error(e)
     finally:
-        cursor.close()
-        conn.close()
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                drained = False
+        # berhenti di tengah = masih ada row belum kebaca di koneksi -> buang, jangan balikin ke pool
+        pool.release(conn, discard=not drained)
+
+
+def fetch_iter(query, params=None, chunk_size=DB_FETCH_CHUNK_SIZE, rows="dict", primary=False):
+    """Ambil data row per row tanpa numpuk semua hasil di memori (fetch per chunk_size row)."""
+    for chunk in _iter_chunks(query, params, chunk_size, rows, primary):
+        yield from chunk
+
+
+# ===== Transaction (unit of work) =====
+class Transaction:
+    """Handle statement di dalam satu transaksi (satu koneksi, satu commit)."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, query, params=None):
+        """Jalankan statement, balikin jumlah row yang kena."""
+        return _cursor_execute(self._conn, query, params)
+
+    def insert(self, query, params=None):
+        """INSERT satu row, balikin id AUTO_INCREMENT-nya."""
+        return _cursor_insert(self._conn, query, params)
+
+    def execute_many(self, query, seq_params):
+        """executemany di transaksi ini (INSERT multi-row kalau driver support)."""
+        return _cursor_execute_many(self._conn, query, list(seq_params))
+
+    def fetch_all(self, query, params=None, rows="dict"):
+        return _cursor_fetch_all(self._conn, query, params, rows)
+
+    def fetch_one(self, query, params=None, rows="dict"):
+        return _cursor_fetch_one(self._conn, query, params, rows)
+
+
+@contextmanager
+def transaction():
+    """``with transaction() as tx:`` — commit kalau blok sukses, rollback kalau ada exception."""
+    with _borrow() as conn:
+        get_backend().begin(conn)
+        yield Transaction(conn)
+        conn.commit()
+
+
+def run_in_transaction(func, *args, **kwargs):
+    """Panggil ``func(tx, *args)`` di dalam transaction(), balikin hasilnya."""
+    with transaction() as tx:
+        return func(tx, *args, **kwargs)
+
+
+# ===== Async API =====
+# Query sync dijalankan di thread executor supaya event loop (handler + reminder_loop) gak ke-block.
+# Jumlah worker = max_size pool, jadi thread gak pernah antri nunggu koneksi di dalam pool.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_POOL_CONFIG["max_size"], thread_name_prefix="db")
+    return _executor
+
+
+async def run_sync(func, *args, **kwargs):
+    """Jalankan fungsi DB sync di executor DB lalu await hasilnya."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    ctx.run(_caller_var.set, _caller())
+    return await loop.run_in_executor(_get_executor(), functools.partial(ctx.run, func, *args, **kwargs))
+
+
+async def afetch_all(query, params=None, rows="dict", primary=False):
+    """Versi async fetch_all."""
+    return await run_sync(fetch_all, query, params, rows, primary)
+
+
+async def afetch_one(query, params=None, rows="dict", primary=False):
+    """Versi async fetch_one."""
+    return await run_sync(fetch_one, query, params, rows, primary)
+
+
+async def aexecute_query(query, params=None):
+    """Versi async execute_query."""
+    return await run_sync(execute_query, query, params)
+
+
+async def aexecute_insert(query, params=None):
+    """Versi async execute_insert."""
+    return await run_sync(execute_insert, query, params)
+
+
+async def aexecute_many(query, seq_params):
+    """Versi async execute_many."""
+    return await run_sync(execute_many, query, list(seq_params))
+
+
+async def aexecute_batch(statements):
+    """Versi async execute_batch."""
+    return await run_sync(execute_batch, list(statements))
+
+
+async def arun_in_transaction(func, *args, **kwargs):
+    """Versi async run_in_transaction (func tetap sync, jalan di thread DB)."""
+    return await run_sync(run_in_transaction, func, *args, **kwargs)
+
+
+async def afetch_iter(query, params=None, chunk_size=DB_FETCH_CHUNK_SIZE, rows="dict", primary=False):
+    """Versi async fetch_iter: ``async for row in afetch_iter(...)``; tiap chunk diambil di thread DB.
+
+    Koneksi (dan result set unbuffered di MySQL) kepegang sampai loop selesai: jangan nge-await kerjaan
+    lambat per row di dalam loop-nya. Buat job yang kirim pesan / buka transaksi per row pakai afetch_keyset.
+    """
+    chunks = _iter_chunks(query, params, chunk_size, rows, primary)
+    try:
+        while True:
+            chunk = await run_sync(next, chunks, None)
+            if chunk is None:
+                break
+            for row in chunk:
+                yield row
+    finally:
+        await run_sync(chunks.close)
+
+
+async def afetch_keyset(query, key, after, params=(), chunk_size=DB_FETCH_CHUNK_SIZE, rows="dict", primary=False):
+    """Iterasi tabel besar per halaman keyset: ``async for row in afetch_keyset(...)``.
+
+    `query` diakhiri ``<key> > %s ORDER BY <key> LIMIT %s`` (dua param terakhir diisi di sini, mulai dari
+    `after`). Tiap halaman satu fetch_all biasa, jadi gak ada koneksi/cursor yang kebuka selama caller
+    nge-await kerjaan per row.
+    """
+    while True:
+        page = await afetch_all(query, (*params, after, chunk_size), rows, primary)
+        for row in page:
+            yield row
+        if len(page) < chunk_size:
+            return
+        after = page[-1][key]
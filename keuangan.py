@@ -1,16 +1,25 @@
 # ===== keuangan_fixed.py =====
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from db import execute_query, fetch_one, fetch_all
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from db import aexecute_batch, afetch_one, afetch_all, afetch_keyset, arun_in_transaction, is_degraded, DB_ERRORS
+from utils import now_wib
+import leader
+import logging
 import re
 import math
 import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 # ===== Konfigurasi =====
 PAGE_SIZE = 10
 CALLBACK_PREFIX = "keu:"  # prefix unik supaya gak bentrok dengan callback lain
 # berapa detik action user valid (5 menit)
 KEU_ACTION_EXPIRE_SECONDS = 5 * 60
+DB_FAIL_TEXT = "Gagal nyimpen ke database master 🥺, coba lagi nanti ya"
 
 # ===== Format Rupiah =====
 def format_rp(nominal):
@@ -27,55 +36,237 @@ def build_keuangan_menu_text_and_markup():
         [InlineKeyboardButton("🛒 Pakai Tabungan", callback_data=CALLBACK_PREFIX + "pakai_tabungan")],
         [InlineKeyboardButton("📝 Pengeluaran Sehari-hari", callback_data=CALLBACK_PREFIX + "pengeluaran")],
         [InlineKeyboardButton("📜 List History & Ringkasan", callback_data=CALLBACK_PREFIX + "list_history")],
+        [InlineKeyboardButton("📊 Laporan Bulanan", callback_data=CALLBACK_PREFIX + "report")],
         [InlineKeyboardButton("❌ Delete All Data", callback_data=CALLBACK_PREFIX + "delete_all")],
     ]
     return text, InlineKeyboardMarkup(keyboard)
 
-# ===== FETCH history (paginated) dari DB =====
-def get_history_count():
-    q = """
-    SELECT COUNT(*) as cnt FROM (
-        SELECT id, tanggal FROM tabungan
-        UNION ALL
-        SELECT id, tanggal FROM pakai_tabungan
-        UNION ALL
-        SELECT id, tanggal FROM pengeluaran
-    ) t
-    """
-    row = fetch_one(q)
-    return int(row["cnt"] or 0)
-
-def get_history_page(page, per_page=PAGE_SIZE):
-    offset = (page - 1) * per_page
-    q = f"""
-    SELECT * FROM (
-        SELECT 'Tabungan' AS jenis, id, tanggal, nominal, keterangan as note
-        FROM tabungan
-        UNION ALL
-        SELECT 'PakaiTabungan' AS jenis, id, tanggal, nominal, keterangan as note
-        FROM pakai_tabungan
-        UNION ALL
-        SELECT 'Pengeluaran' AS jenis, id, tanggal, nominal, CONCAT(kategori, ': ', deskripsi) as note
-        FROM pengeluaran
-    ) u
-    ORDER BY tanggal DESC
-    LIMIT %s OFFSET %s
+# ===== FETCH history (paginated, keyset) dari keuangan_ledger =====
+CURSOR_FMT = "%Y%m%d%H%M%S"
+# keu:list:<page>[:<n|p><tanggal YYYYmmddHHMMSS>_<id ledger>] (maks ~45 byte, limit Telegram 64)
+HISTORY_RE = re.compile(r"^keu:list:(?P<page>\d+)(?::(?P<dir>[np])(?P<tgl>\d{14})_(?P<id>\d+))?$")
+HISTORY_SELECT = "SELECT id, jenis, tanggal, nominal, note FROM keuangan_ledger WHERE user_id=%s"
+HISTORY_COUNT_QUERY = "SELECT jumlah_transaksi FROM keuangan_saldo WHERE user_id=%s"
+
+def history_page_query(direction=None):
+    """SQL satu halaman riwayat. Params: user_id, [tanggal, tanggal, id,] limit."""
+    if direction == "n":
+        return HISTORY_SELECT + " AND (tanggal < %s OR (tanggal = %s AND id < %s)) ORDER BY tanggal DESC, id DESC LIMIT %s"
+    if direction == "p":
+        return HISTORY_SELECT + " AND (tanggal > %s OR (tanggal = %s AND id > %s)) ORDER BY tanggal ASC, id ASC LIMIT %s"
+    return HISTORY_SELECT + " ORDER BY tanggal DESC, id DESC LIMIT %s"
+
+def _to_dt(val):
+    if isinstance(val, datetime):
+        return val
+    return datetime.strptime(str(val)[:19], "%Y-%m-%d %H:%M:%S")
+
+def _encode_cursor(direction, row):
+    return f"{direction}{_to_dt(row['tanggal']).strftime(CURSOR_FMT)}_{int(row['id'])}"
+
+async def get_history_count(user_id):
+    # jumlah transaksi di-maintain di keuangan_saldo (naik bareng tiap insert), bukan COUNT(*) 3 tabel
+    row = await afetch_one(HISTORY_COUNT_QUERY, (user_id,))
+    return int(row["jumlah_transaksi"] or 0) if row else 0
+
+async def get_history_page(user_id, direction=None, cursor=None, per_page=PAGE_SIZE):
+    """Satu halaman riwayat (terbaru dulu) pakai keyset (tanggal, id), bukan OFFSET.
+
+    direction "n" = lebih lama dari cursor, "p" = lebih baru, None = halaman pertama.
+    Balikin (rows, ada_lagi_ke_arah_itu).
     """
-    rows = fetch_all(q, (per_page, offset))
-    return rows or []
+    limit = per_page + 1
+    query = history_page_query(direction)
+    if direction is None:
+        rows = await afetch_all(query, (user_id, limit), rows="record")
+    else:
+        tgl, ledger_id = cursor
+        rows = await afetch_all(query, (user_id, tgl, tgl, ledger_id, limit), rows="record")
+    if direction == "p":
+        return list(reversed(rows[:per_page])), len(rows) > per_page
+    return rows[:per_page], len(rows) > per_page
+
+async def load_history_page(user_id, page, direction=None, cursor=None):
+    """get_history_page + posisi halaman. Balikin (rows, page, has_prev, has_next)."""
+    rows, more = await get_history_page(user_id, direction, cursor)
+    if not rows and direction:
+        # halaman yang dituju udah kosong (habis delete_all) -> balik ke halaman pertama
+        page, direction = 1, None
+        rows, more = await get_history_page(user_id)
+    if direction == "p":
+        return rows, (page if more else 1), more, True
+    return rows, page, page > 1, more
+
+# ===== Ledger (riwayat gabungan, ditulis di transaksi yang sama dengan insert aslinya) =====
+LEDGER_SOURCES = {
+    "Tabungan": ("tabungan", "keterangan"),
+    "PakaiTabungan": ("pakai_tabungan", "keterangan"),
+    "Pengeluaran": ("pengeluaran", "COALESCE(CONCAT(kategori, ': ', deskripsi), kategori)"),
+}
+
+def _catat_ledger(tx, jenis, ref_id):
+    # disalin dari row aslinya biar tanggal (NOW() server DB) sama persis
+    table, note = LEDGER_SOURCES[jenis]
+    tx.execute(
+        "INSERT INTO keuangan_ledger (user_id, jenis, ref_id, tanggal, nominal, note) "
+        f"SELECT user_id, %s, id, tanggal, nominal, {note} FROM {table} WHERE id=%s",
+        (jenis, ref_id)
+    )
+
+# ===== Rollup pengeluaran per bulan per kategori (tabel keuangan_rollup) =====
+# YYYYMM. Rollup ngitung dari tanggal row pengeluaran (NOW() server DB waktu insert), jadi "bulan ini"
+# di laporan juga harus dari NOW() DB — jam bot (WIB) vs DB (mis. UTC) bisa beda bulan di tanggal 1
+_BULAN_SQL = "YEAR({0}) * 100 + MONTH({0})"
+ROLLUP_BULAN = _BULAN_SQL.format("tanggal")
+CURRENT_BULAN_QUERY = f"SELECT {_BULAN_SQL.format('NOW()')} AS bulan"
+
+# upsert dari row aslinya, jadi bulan ikut NOW() server DB sama kayak ledger
+ROLLUP_UPSERT_QUERY = (
+    "INSERT INTO keuangan_rollup (user_id, bulan, kategori, total, jumlah) "
+    f"SELECT user_id, {ROLLUP_BULAN}, kategori, nominal, 1 FROM pengeluaran WHERE id=%s "
+    "ON DUPLICATE KEY UPDATE total = total + VALUES(total), jumlah = jumlah + VALUES(jumlah)"
+)
+ROLLUP_SELECT_QUERY = "SELECT bulan, kategori, total, jumlah FROM keuangan_rollup WHERE user_id=%s"
+REBUILD_ROLLUP_QUERY = (
+    "INSERT INTO keuangan_rollup (user_id, bulan, kategori, total, jumlah) "
+    f"SELECT user_id, {ROLLUP_BULAN}, kategori, SUM(nominal), COUNT(*) FROM pengeluaran "
+    f"WHERE user_id=%s GROUP BY user_id, {ROLLUP_BULAN}, kategori"
+)
+
+def _rollup_pengeluaran(tx, ref_id):
+    tx.execute(ROLLUP_UPSERT_QUERY, (ref_id,))
+
+def _rebuild_rollup(tx, user_id):
+    """Hitung ulang rollup satu user dari row pengeluaran. Balikin jumlah baris rollup yang beda (drift)."""
+    lama = {(r["bulan"], r["kategori"]): (int(r["total"]), int(r["jumlah"]))
+            for r in tx.fetch_all(ROLLUP_SELECT_QUERY, (user_id,))}
+    tx.execute("DELETE FROM keuangan_rollup WHERE user_id=%s", (user_id,))
+    tx.execute(REBUILD_ROLLUP_QUERY, (user_id,))
+    baru = {(r["bulan"], r["kategori"]): (int(r["total"]), int(r["jumlah"]))
+            for r in tx.fetch_all(ROLLUP_SELECT_QUERY, (user_id,))}
+    return sum(1 for k in lama.keys() | baru.keys() if lama.get(k) != baru.get(k))
+
+RECONCILE_USERS_QUERY = "SELECT user_id FROM keuangan_saldo WHERE user_id > %s ORDER BY user_id LIMIT %s"
+
+async def reconcile_rollups_job():
+    """Rebuild rollup semua user dari row pengeluaran (03:00 WIB), jaga-jaga kalau ada yang meleset."""
+    if not await leader.run_as_leader("rekonsiliasi rollup keuangan"):
+        return
+    if is_degraded():
+        logger.warning("DB lagi down, skip rekonsiliasi rollup keuangan (dicoba lagi besok)")
+        return
+    started = time.monotonic()
+    users = drift = 0
+    # satu transaksi per user biar lock-nya pendek; daftar user per halaman keyset (gak ada cursor
+    # yang kebuka selama transaksi). Mulai dari -1: data lama yang belum diklaim ada di user_id 0
+    async for row in afetch_keyset(RECONCILE_USERS_QUERY, "user_id", -1, rows="record"):
+        try:
+            drift += await arun_in_transaction(_rebuild_rollup, row["user_id"])
+            users += 1
+        except DB_ERRORS as e:
+            logger.warning("Rekonsiliasi rollup user %s gagal: %s", row["user_id"], e)
+    logger.info("Rekonsiliasi rollup keuangan: %d user, %d baris dibenerin, %.1fs",
+                users, drift, time.monotonic() - started)
+
+# ===== Saldo (tabel keuangan_saldo, di-update bareng tiap insert) =====
+def _ensure_saldo(tx, user_id):
+    # upsert, bukan INSERT IGNORE: di InnoDB INSERT IGNORE yang kena duplikat cuma ambil shared lock,
+    # dua transaksi user yang sama lalu sama-sama upgrade ke exclusive di UPDATE -> deadlock (1213).
+    # ON DUPLICATE KEY UPDATE langsung ngunci exclusive, jadi transaksi kedua antri dari awal.
+    tx.execute(
+        "INSERT INTO keuangan_saldo (user_id) VALUES (%s) ON DUPLICATE KEY UPDATE user_id=VALUES(user_id)",
+        (user_id,)
+    )
+
+def _get_saldo(tx, user_id):
+    row = tx.fetch_one(
+        "SELECT total_tabungan, total_pakai FROM keuangan_saldo WHERE user_id=%s", (user_id,)
+    )
+    return (int(row["total_tabungan"]), int(row["total_pakai"])) if row else (0, 0)
+
+def _catat_pengeluaran(tx, user_id, kategori, deskripsi, nominal):
+    _ensure_saldo(tx, user_id)
+    ref_id = tx.insert(
+        "INSERT INTO pengeluaran (user_id, tanggal, kategori, deskripsi, nominal) VALUES (%s, NOW(), %s, %s, %s)",
+        (user_id, kategori, deskripsi, nominal)
+    )
+    _catat_ledger(tx, "Pengeluaran", ref_id)
+    _rollup_pengeluaran(tx, ref_id)
+    tx.execute(
+        "UPDATE keuangan_saldo SET total_pengeluaran = total_pengeluaran + %s, "
+        "jumlah_transaksi = jumlah_transaksi + 1 WHERE user_id=%s",
+        (nominal, user_id)
+    )
+
+def _tambah_tabungan(tx, user_id, nominal, keterangan):
+    _ensure_saldo(tx, user_id)
+    ref_id = tx.insert(
+        "INSERT INTO tabungan (user_id, tanggal, nominal, keterangan) VALUES (%s, NOW(), %s, %s)",
+        (user_id, nominal, keterangan)
+    )
+    _catat_ledger(tx, "Tabungan", ref_id)
+    tx.execute(
+        "UPDATE keuangan_saldo SET total_tabungan = total_tabungan + %s, "
+        "jumlah_transaksi = jumlah_transaksi + 1 WHERE user_id=%s",
+        (nominal, user_id)
+    )
+
+def _pakai_tabungan(tx, user_id, nominal, keterangan):
+    """Cek saldo + catat pemakaian atomik. Balikin (berhasil, sisa tabungan)."""
+    _ensure_saldo(tx, user_id)
+    # UPDATE bersyarat ngunci row saldo sampai commit -> dua pemakaian barengan gak bisa lolos dua-duanya
+    ok = tx.execute(
+        "UPDATE keuangan_saldo SET total_pakai = total_pakai + %s, jumlah_transaksi = jumlah_transaksi + 1 "
+        "WHERE user_id=%s AND total_tabungan - total_pakai >= %s",
+        (nominal, user_id, nominal)
+    )
+    if ok:
+        ref_id = tx.insert(
+            "INSERT INTO pakai_tabungan (user_id, tanggal, nominal, keterangan) VALUES (%s, NOW(), %s, %s)",
+            (user_id, nominal, keterangan)
+        )
+        _catat_ledger(tx, "PakaiTabungan", ref_id)
+    total_tabungan, total_pakai = _get_saldo(tx, user_id)
+    return bool(ok), total_tabungan - total_pakai
 
 # ===== Ringkasan & 5 data terakhir =====
-def get_summary_and_last5():
-    total_tabungan = fetch_one("SELECT SUM(nominal) as total FROM tabungan")["total"] or 0
-    total_pakai = fetch_one("SELECT SUM(nominal) as total FROM pakai_tabungan")["total"] or 0
-    total_pengeluaran = fetch_one("SELECT SUM(nominal) as total FROM pengeluaran")["total"] or 0
+# satu query (satu round trip): 3 total dari keuangan_saldo + 5 data terakhir per tabel (index user_id, tanggal)
+SUMMARY_QUERY = """
+SELECT 'total_tabungan' AS jenis, NULL AS tanggal, total_tabungan AS nominal, NULL AS keterangan, NULL AS kategori
+FROM keuangan_saldo WHERE user_id=%s
+UNION ALL
+SELECT 'total_pakai', NULL, total_pakai, NULL, NULL FROM keuangan_saldo WHERE user_id=%s
+UNION ALL
+SELECT 'total_pengeluaran', NULL, total_pengeluaran, NULL, NULL FROM keuangan_saldo WHERE user_id=%s
+UNION ALL
+SELECT * FROM (
+    SELECT 'tabungan' AS jenis, tanggal, nominal, keterangan, NULL AS kategori
+    FROM tabungan WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5
+) t
+UNION ALL
+SELECT * FROM (
+    SELECT 'pakai' AS jenis, tanggal, nominal, keterangan, NULL AS kategori
+    FROM pakai_tabungan WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5
+) p
+UNION ALL
+SELECT * FROM (
+    SELECT 'pengeluaran' AS jenis, tanggal, nominal, deskripsi AS keterangan, kategori
+    FROM pengeluaran WHERE user_id=%s ORDER BY tanggal DESC LIMIT 5
+) k
+"""
+def build_summary_text(rows):
+    totals = {r["jenis"]: int(r["nominal"] or 0) for r in rows if r["jenis"].startswith("total_")}
+    last = {"tabungan": [], "pakai": [], "pengeluaran": []}
+    for r in rows:
+        if r["jenis"] in last:
+            last[r["jenis"]].append(r)
+    for items in last.values():
+        items.sort(key=lambda r: str(r["tanggal"]), reverse=True)
+    total_tabungan = totals.get("total_tabungan", 0)
+    total_pakai = totals.get("total_pakai", 0)
+    total_pengeluaran = totals.get("total_pengeluaran", 0)
     sisa_tabungan = total_tabungan - total_pakai
 
-    # ambil 5 data terakhir
-    last_tabungan = fetch_all("SELECT tanggal, nominal, keterangan FROM tabungan ORDER BY tanggal DESC LIMIT 5") or []
-    last_pakai = fetch_all("SELECT tanggal, nominal, keterangan FROM pakai_tabungan ORDER BY tanggal DESC LIMIT 5") or []
-    last_pengeluaran = fetch_all("SELECT tanggal, kategori, deskripsi, nominal FROM pengeluaran ORDER BY tanggal DESC LIMIT 5") or []
-
     text = (
         f"📊 **Ringkasan Keuangan Master**\n\n"
         f"💰 Total Tabungan: {format_rp(total_tabungan)}\n"
@@ -85,21 +276,74 @@ def get_summary_and_last5():
         f"📌 5 Data Terakhir:\n\n"
     )
 
-    if last_tabungan:
-        text += "💰 Nabung:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('keterangan','')})" for r in last_tabungan]) + "\n\n"
-    if last_pakai:
-        text += "🛒 Pakai Tabungan:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('keterangan','')})" for r in last_pakai]) + "\n\n"
-    if last_pengeluaran:
-        text += "📝 Pengeluaran:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('kategori','')}:{r.get('deskripsi','')})" for r in last_pengeluaran]) + "\n\n"
+    if last["tabungan"]:
+        text += "💰 Nabung:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('keterangan') or ''})" for r in last["tabungan"]]) + "\n\n"
+    if last["pakai"]:
+        text += "🛒 Pakai Tabungan:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('keterangan') or ''})" for r in last["pakai"]]) + "\n\n"
+    if last["pengeluaran"]:
+        text += "📝 Pengeluaran:\n" + "\n".join([f"- {r['tanggal']} | {format_rp(r['nominal'])} ({r.get('kategori') or ''}:{r.get('keterangan') or ''})" for r in last["pengeluaran"]]) + "\n\n"
 
     return text.strip()
 
+async def get_summary_and_last5(user_id):
+    # gak di-cache: cache per proses basi di instance lain, dan query-nya cuma satu round trip ber-index.
+    # primary: ringkasan biasanya dibuka pas habis nulis, replica yang ketinggalan bikin angkanya mundur
+    rows = await afetch_all(SUMMARY_QUERY, (user_id,) * 6, primary=True)
+    return build_summary_text(rows)
+
+# ===== Laporan bulanan (cuma baca keuangan_rollup) =====
+REPORT_RE = re.compile(r"^keu:report(?::(?P<bulan>\d{6}))?$")
+NAMA_BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni",
+              "Juli", "Agustus", "September", "Oktober", "November", "Desember"]
+
+def _geser_bulan(bulan, delta):
+    y, m = divmod(bulan, 100)
+    idx = y * 12 + (m - 1) + delta
+    return (idx // 12) * 100 + idx % 12 + 1
+
+MONTHLY_REPORT_QUERY = (
+    "SELECT kategori, total, jumlah FROM keuangan_rollup WHERE user_id=%s AND bulan=%s ORDER BY total DESC"
+)
+
+async def get_current_bulan():
+    row = await afetch_one(CURRENT_BULAN_QUERY)
+    if row:
+        return int(row["bulan"])
+    sekarang = now_wib()  # DB gak bisa dihubungi: laporannya juga bakal kosong
+    return sekarang.year * 100 + sekarang.month
+
+async def get_monthly_report(user_id, bulan):
+    return await afetch_all(MONTHLY_REPORT_QUERY, (user_id, bulan))
+
+def build_report_text(bulan, rows):
+    y, m = divmod(bulan, 100)
+    total = sum(int(r["total"]) for r in rows)
+    lines = [f"📊 Laporan Pengeluaran {NAMA_BULAN[m - 1]} {y}\n"]
+    if not rows:
+        lines.append("Belum ada pengeluaran di bulan ini master 🥺")
+    for r in rows:
+        persen = int(r["total"]) * 100 / total if total else 0
+        lines.append(f"- {r['kategori']}: {format_rp(r['total'])} ({r['jumlah']}x, {persen:.0f}%)")
+    lines.append(f"\nTotal: {format_rp(total)}")
+    return "\n".join(lines)
+
 # ===== Command /keuangan =====
 async def keuangan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text, reply_markup = build_keuangan_menu_text_and_markup()
     await update.message.reply_text(text, reply_markup=reply_markup)
 
 # ===== Callback Handler (strict routing) =====
+# delete_all: semua data keuangan user ini dalam satu transaksi (param: user_id)
+DELETE_ALL_KEUANGAN = [
+    "DELETE FROM tabungan WHERE user_id=%s",
+    "DELETE FROM pengeluaran WHERE user_id=%s",
+    "DELETE FROM pakai_tabungan WHERE user_id=%s",
+    "DELETE FROM keuangan_ledger WHERE user_id=%s",
+    "DELETE FROM keuangan_rollup WHERE user_id=%s",
+    "UPDATE keuangan_saldo SET total_tabungan=0, total_pakai=0, total_pengeluaran=0, jumlah_transaksi=0 "
+    "WHERE user_id=%s",
+]
+
 VALID_ACTIONS = {"tambah_tabungan", "pakai_tabungan", "pengeluaran", "list_history", "delete_all"}
 
 async def keuangan_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -114,6 +358,8 @@ async def keuangan_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     payload = data[len(CALLBACK_PREFIX):]
+    # data keuangan per user Telegram
+    user_id = update.effective_user.id
 
     # exact matches
     if payload in VALID_ACTIONS:
@@ -141,34 +387,41 @@ async def keuangan_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         if payload == "delete_all":
             # delete everything (keputusan design: keep immediate delete, but safe via strict callback)
-            execute_query("DELETE FROM tabungan;")
-            execute_query("DELETE FROM pengeluaran;")
-            execute_query("DELETE FROM pakai_tabungan;")
+            # cuma data milik user ini
+            ok = await aexecute_batch([(q, (user_id,)) for q in DELETE_ALL_KEUANGAN])
+            context.user_data.pop("keu_action", None)
+            context.user_data.pop("keu_action_ts", None)
+            if not ok:
+                # transaksi di-rollback -> gak ada yang kehapus
+                await query.message.edit_text(DB_FAIL_TEXT)
+                return
             text, reply_markup = build_keuangan_menu_text_and_markup()
             await query.message.edit_text("Udah terhapus semua master! Mari mulai data keuangan baru 🥹❤️\n\n" + text,
                                           reply_markup=reply_markup)
-            context.user_data.pop("keu_action", None)
-            context.user_data.pop("keu_action_ts", None)
             return
 
         if payload == "list_history":
             # show summary + first page (we support optional pagination below)
-            summary = get_summary_and_last5()
-            await query.message.edit_text(summary, parse_mode="Markdown")
+            summary = await get_summary_and_last5(user_id)
+            kb = [[InlineKeyboardButton("📜 Riwayat Lengkap", callback_data=CALLBACK_PREFIX + "list:1")]]
+            await query.message.edit_text(summary, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(kb))
             context.user_data.pop("keu_action", None)
             context.user_data.pop("keu_action_ts", None)
             return
 
-    # support paginated list: keu:list:<page>
-    if payload.startswith("list:"):
-        try:
-            _, page_str = payload.split(":", 1)
-            page = int(page_str)
-        except Exception:
-            page = 1
-        rows = get_history_page(page)
-        total = get_history_count()
-        total_pages = max(1, math.ceil(total / PAGE_SIZE))
+    # support paginated list: keu:list:<page>[:cursor]
+    m = HISTORY_RE.match(data)
+    if m:
+        if m.group("dir"):
+            page = max(1, int(m.group("page")))
+            direction = m.group("dir")
+            cursor = (datetime.strptime(m.group("tgl"), CURSOR_FMT), int(m.group("id")))
+        else:
+            # tanpa cursor (tombol entry / tombol lama) = selalu halaman pertama
+            page, direction, cursor = 1, None, None
+        rows, page, has_prev, has_next = await load_history_page(user_id, page, direction, cursor)
+        total = await get_history_count(user_id)
+        total_pages = max(1, math.ceil(total / PAGE_SIZE), page)
         # build text
         if not rows:
             await query.message.edit_text("Belum ada riwayat transaksi.")
@@ -183,15 +436,35 @@ async def keuangan_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # simple pagination keyboard
         kb = []
         nav = []
-        if page > 1:
-            nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=CALLBACK_PREFIX + f"list:{page-1}"))
+        if has_prev:
+            nav.append(InlineKeyboardButton(
+                "⬅️ Prev", callback_data=CALLBACK_PREFIX + f"list:{page-1}:{_encode_cursor('p', rows[0])}"))
         nav.append(InlineKeyboardButton("🏠 Menu Utama", callback_data=CALLBACK_PREFIX + "list_history"))
-        if page < total_pages:
-            nav.append(InlineKeyboardButton("➡️ Next", callback_data=CALLBACK_PREFIX + f"list:{page+1}"))
+        if has_next:
+            nav.append(InlineKeyboardButton(
+                "➡️ Next", callback_data=CALLBACK_PREFIX + f"list:{page+1}:{_encode_cursor('n', rows[-1])}"))
         kb.append(nav)
         await query.message.edit_text("\n".join(lines), reply_markup=InlineKeyboardMarkup(kb))
         return
 
+    # laporan bulanan: keu:report[:YYYYMM] (default bulan ini)
+    m = REPORT_RE.match(data)
+    if m:
+        bulan_ini = await get_current_bulan()
+        bulan = int(m.group("bulan") or bulan_ini)
+        if not 1 <= bulan % 100 <= 12:
+            bulan = bulan_ini
+        rows = await get_monthly_report(user_id, bulan)
+        nav = [InlineKeyboardButton("⬅️ Bulan Lalu", callback_data=CALLBACK_PREFIX + f"report:{_geser_bulan(bulan, -1)}")]
+        if bulan < bulan_ini:
+            nav.append(InlineKeyboardButton(
+                "➡️ Bulan Depan", callback_data=CALLBACK_PREFIX + f"report:{_geser_bulan(bulan, 1)}"))
+        kb = [nav, [InlineKeyboardButton("🏠 Menu Utama", callback_data=CALLBACK_PREFIX + "list_history")]]
+        await query.message.edit_text(build_report_text(bulan, rows), reply_markup=InlineKeyboardMarkup(kb))
+        context.user_data.pop("keu_action", None)
+        context.user_data.pop("keu_action_ts", None)
+        return
+
     # unknown/unsafe payload -> ignore but politely inform
     try:
         await query.message.reply_text("Terjadi sesuatu yang tak terduga — coba lagi ya master 🥺")
@@ -218,15 +491,15 @@ async def keuangan_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     text = (update.message.text or "").strip()
+    user_id = update.effective_user.id
 
     if action == "tambah_tabungan":
         try:
             nominal = int(re.sub(r"[^\d\-]", "", text))  # allow thousand separators but strip non-digits
-            execute_query(
-                "INSERT INTO tabungan (tanggal, nominal, keterangan) VALUES (NOW(), %s, %s)",
-                (nominal, "Nabung bebas")
-            )
+            await arun_in_transaction(_tambah_tabungan, user_id, nominal, "Nabung bebas")
             await update.message.reply_text(f"Horeee master menabung {format_rp(nominal)} bijak banget 🥺❤️")
+        except DB_ERRORS:
+            await update.message.reply_text(DB_FAIL_TEXT)
         except Exception:
             await update.message.reply_text("Format salah master, coba angka aja ya 🥹")
 
@@ -237,18 +510,17 @@ async def keuangan_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE
                 raise ValueError("Format salah")
             nominal = int(re.sub(r"[^\d\-]", "", parts[0]))
             keterangan = parts[1].strip()
-            total_tabungan = fetch_one("SELECT SUM(nominal) as total FROM tabungan")["total"] or 0
-            total_pakai = fetch_one("SELECT SUM(nominal) as total FROM pakai_tabungan")["total"] or 0
-            sisa_tabungan = total_tabungan - total_pakai
+            if nominal <= 0:
+                raise ValueError("Nominal harus positif")
+            # cek saldo + insert di satu transaksi (primary), bukan SUM dua tabel lalu insert terpisah
+            ok, sisa_tabungan = await arun_in_transaction(_pakai_tabungan, user_id, nominal, keterangan)
 
-            if nominal > sisa_tabungan:
+            if not ok:
                 await update.message.reply_text(f"Tidak ada isi tabungan yang cukup master 🥺, sisa: {format_rp(sisa_tabungan)}")
             else:
-                execute_query(
-                    "INSERT INTO pakai_tabungan (tanggal, nominal, keterangan) VALUES (NOW(), %s, %s)",
-                    (nominal, keterangan)
-                )
                 await update.message.reply_text(f"Hmmphh master, {format_rp(nominal)} dipakai untuk {keterangan} 😎")
+        except DB_ERRORS:
+            await update.message.reply_text(DB_FAIL_TEXT)
         except Exception:
             await update.message.reply_text("Format salah master, contoh: 2000 beli snack 🥺")
 
@@ -260,11 +532,10 @@ async def keuangan_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE
                 raise ValueError("Format kategori:deskripsi salah")
             kategori, deskripsi = kategori_deskripsi.split(":", 1)
             nominal = int(re.sub(r"[^\d\-]", "", nominal_str))
-            execute_query(
-                "INSERT INTO pengeluaran (tanggal, kategori, deskripsi, nominal) VALUES (NOW(), %s, %s, %s)",
-                (kategori.strip(), deskripsi.strip(), nominal)
-            )
+            await arun_in_transaction(_catat_pengeluaran, user_id, kategori.strip(), deskripsi.strip(), nominal)
             await update.message.reply_text(f"Terimakasih master, pengeluaran '{deskripsi.strip()}' sebesar {format_rp(nominal)} tercatat 😎")
+        except DB_ERRORS:
+            await update.message.reply_text(DB_FAIL_TEXT)
         except Exception:
             await update.message.reply_text("Format salah master, contoh: makanan:nasi goreng 20000 🥺")
 
@@ -272,6 +543,41 @@ async def keuangan_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE
     context.user_data.pop("keu_action", None)
     context.user_data.pop("keu_action_ts", None)
 
+# ===== Query hot path buat EXPLAIN check (python schema.py) =====
+_SAMPLE_DT = "2025-01-01 00:00:00"
+HOT_QUERIES = [
+    ("get_history_page (first)", history_page_query(), (1, 11)),
+    ("get_history_page (next)", history_page_query("n"), (1, _SAMPLE_DT, _SAMPLE_DT, 1, 11)),
+    ("get_history_page (prev)", history_page_query("p"), (1, _SAMPLE_DT, _SAMPLE_DT, 1, 11)),
+    ("get_history_count", HISTORY_COUNT_QUERY, (1,)),
+    ("get_summary_and_last5", SUMMARY_QUERY, (1,) * 6),
+    ("get_monthly_report", MONTHLY_REPORT_QUERY, (1, 202501)),
+    ("_rollup_pengeluaran", ROLLUP_UPSERT_QUERY, (1,)),
+    ("_rebuild_rollup", REBUILD_ROLLUP_QUERY, (1,)),
+    ("reconcile_rollups_job", RECONCILE_USERS_QUERY, (-1, 500)),
+    *[(f"delete_all #{i}", q, (1,)) for i, q in enumerate(DELETE_ALL_KEUANGAN, 1)],
+]
+
+# ===== Scheduler (rekonsiliasi rollup tiap malam) =====
+scheduler: AsyncIOScheduler = None
+
+async def on_startup(app):
+    global scheduler
+    if scheduler is None:
+        scheduler = AsyncIOScheduler(timezone="Asia/Jakarta")
+    try:
+        scheduler.add_job(reconcile_rollups_job,
+                          trigger=CronTrigger(hour=3, minute=0, timezone="Asia/Jakarta"),
+                          id="keuangan_rollup_reconcile",
+                          replace_existing=True)
+    except Exception:
+        logger.exception("Gagal tambahkan job rekonsiliasi rollup 03:00")
+    leader.get_lease().start()
+    try:
+        scheduler.start()
+    except Exception as e:
+        logger.debug("Scheduler start: %s", e)
+
 # ===== Daftar Handler (register ke application) =====
 def register_handlers(app):
     app.add_handler(CommandHandler("keuangan", keuangan_command))
@@ -281,7 +587,8 @@ def register_handlers(app):
     strict_pattern = re.compile(
         r"^(?:"
         r"keu:tambah_tabungan|keu:pakai_tabungan|keu:pengeluaran|keu:list_history|keu:delete_all|"
-        r"keu:list:\d+"
+        r"keu:list:\d+(?::[np]\d{14}_\d+)?|"
+        r"keu:report(?::\d{6})?"
         r")$"
     )
 
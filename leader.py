@@ -0,0 +1,313 @@
+# ===== leader.py =====
+# Leader election antar instance bot lewat lease row di DB (tabel leader_lease).
+# Job periodik (reminder_loop, cron mood) cuma jalan di instance yang pegang lease.
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime
+
+import db
+from config import LEADER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# id unik proses ini (host:pid:acak) — dipakai sebagai holder lease (kolom holder VARCHAR(128))
+INSTANCE_KEY = uuid.uuid4().hex[:8]
+INSTANCE_ID = f"{socket.gethostname()[:100]}:{os.getpid()}:{INSTANCE_KEY}"
+
+
+def _claim(tx, name, holder, ttl):
+    """Ambil/perpanjang lease `name` kalau kosong, expired, atau memang punya kita. Balikin True kalau kita leader."""
+    # expiry dihitung & dibandingin pakai jam server DB (NOW()), bukan jam tiap host:
+    # clock skew antar instance gak bisa bikin dua leader
+    tx.execute(
+        "INSERT IGNORE INTO leader_lease (name, holder, expires_at, heartbeat_at) "
+        "VALUES (%s, %s, NOW() + INTERVAL %s SECOND, NOW())",
+        (name, holder, ttl),
+    )
+    tx.execute(
+        "UPDATE leader_lease SET holder=%s, expires_at=NOW() + INTERVAL %s SECOND, heartbeat_at=NOW() "
+        "WHERE name=%s AND (holder=%s OR expires_at < NOW())",
+        (holder, ttl, name, holder),
+    )
+    # dicek ulang (bukan dari rowcount): MySQL ngitung row "changed", bukan "matched"
+    row = tx.fetch_one("SELECT holder FROM leader_lease WHERE name=%s", (name,))
+    return bool(row) and row["holder"] == holder
+
+
+def _release(tx, name, holder):
+    return tx.execute(
+        "UPDATE leader_lease SET expires_at=%s WHERE name=%s AND holder=%s",
+        (datetime(1970, 1, 1), name, holder),
+    )
+
+
+def _forget(tx, name, holder):
+    return tx.execute("DELETE FROM leader_lease WHERE name=%s AND holder=%s", (name, holder))
+
+
+def _prune(tx, pattern):
+    return tx.execute("DELETE FROM leader_lease WHERE name LIKE %s AND expires_at < NOW()", (pattern,))
+
+
+class LeaderLease:
+    """Lease bernama dengan heartbeat.
+
+    Instance yang pegang lease memperpanjang tiap `renew_interval` detik. Kalau leader mati,
+    lease expired setelah `ttl` detik dan standby ngambil alih di heartbeat berikutnya
+    (maks kira-kira ttl + renew_interval). Leader yang gagal renew berhenti nganggap dirinya
+    leader sebelum lease-nya expired di DB, jadi gak pernah ada dua leader sekaligus.
+    Expiry di DB pakai jam server DB, batas lokal pakai monotonic yang mulai sebelum claim,
+    jadi jam host yang beda-beda gak ngaruh.
+    """
+
+    def __init__(self, name, ttl=None, renew_interval=None, holder=INSTANCE_ID, heartbeat=True):
+        self.name = name
+        self.ttl = ttl or LEADER_CONFIG["lease_ttl"]
+        self.renew_interval = renew_interval or LEADER_CONFIG["renew_interval"]
+        self.holder = holder
+        self.heartbeat = heartbeat  # False = try_acquire dipanggil pihak lain (ShardCoordinator)
+        self._valid_until = 0.0  # monotonic; lewat dari ini = anggap bukan leader lagi
+        self._elected = asyncio.Event()
+        self._task = None
+
+    def is_leader(self):
+        return time.monotonic() < self._valid_until
+
+    async def try_acquire(self):
+        """Satu putaran heartbeat: ambil/perpanjang lease. Balikin status leader."""
+        started = time.monotonic()
+        was_leader = self.is_leader()
+        try:
+            won = await db.arun_in_transaction(_claim, self.name, self.holder, self.ttl)
+        except db.DB_ERRORS as e:
+            # DB gak bisa dihubungi: status gak diketahui, leader lama jalan terus sampai _valid_until habis
+            logger.warning("Heartbeat lease %s gagal: %s", self.name, e)
+            won = None
+        if won:
+            # margin 1 renew_interval: berhenti duluan sebelum lease di DB beneran expired
+            self._valid_until = started + self.ttl - self.renew_interval
+        elif won is False:
+            self._valid_until = 0.0
+        if won and not was_leader:
+            logger.info("🎖 %s jadi leader '%s'", self.holder, self.name)
+        elif was_leader and not self.is_leader():
+            logger.warning("Lease '%s' lepas dari %s", self.name, self.holder)
+        self._signal()
+        return self.is_leader()
+
+    def _signal(self):
+        if self.is_leader():
+            self._elected.set()
+        else:
+            self._elected.clear()
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await self.try_acquire()
+            except Exception as e:
+                logger.exception("Heartbeat lease %s error: %s", self.name, e)
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self):
+        """Mulai task heartbeat di event loop yang lagi jalan (idempotent)."""
+        if self.heartbeat and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        return self._task
+
+    async def wait_until_leader(self, timeout=None):
+        """Tunggu sampai instance ini leader. Balikin False kalau timeout duluan."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self.is_leader():
+            self._signal()  # lease bisa habis sendiri tanpa heartbeat -> sinkronin event dulu
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._elected.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.is_leader()
+        return True
+
+    def resign(self):
+        """Berhenti jadi leader tanpa lepas row di DB: instance lain baru bisa ambil setelah ttl habis.
+
+        Dipakai waktu rebalancing biar tick yang lagi jalan sempat nyimpen state sebelum shard pindah tangan.
+        """
+        self._valid_until = 0.0
+        self._signal()
+
+    async def release(self, forget=False):
+        """Lepas lease (shutdown rapi) biar standby bisa langsung ngambil alih.
+
+        forget=True: row-nya sekalian dihapus (lease per instance yang namanya gak bakal dipakai lagi).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._valid_until or forget:
+            self._valid_until = 0.0
+            self._signal()
+            try:
+                await db.arun_in_transaction(_forget if forget else _release, self.name, self.holder)
+                logger.info("Lease '%s' dilepas", self.name)
+            except db.DB_ERRORS as e:
+                logger.warning("Gagal lepas lease %s: %s", self.name, e)
+
+
+class StaticAssignment:
+    """Pengganti lease buat pembagian statis (config): selalu dianggap pemilik."""
+
+    def is_leader(self):
+        return True
+
+    async def wait_until_leader(self, timeout=None):
+        return True
+
+
+ALWAYS = StaticAssignment()
+
+
+class ShardCoordinator:
+    """Bagi N shard (lease "<prefix>-<k>/<N>") ke semua instance yang hidup.
+
+    Tiap instance daftar lewat lease member, lalu pegang maks ceil(N / jumlah member) shard.
+    Kelebihan dilepas biar instance baru kebagian (rebalancing); shard yang lease-nya expired
+    (instance mati) diambil instance lain di putaran berikutnya.
+    """
+
+    def __init__(self, prefix, shards, ttl=None, renew_interval=None, on_members=None):
+        self.prefix = prefix
+        self.shards = shards
+        self.on_members = on_members  # dipanggil dengan jumlah member tiap kali angkanya berubah
+        self.members = None
+        self.member = LeaderLease(f"{prefix}-member-{INSTANCE_KEY}", ttl, renew_interval, heartbeat=False)
+        self.leases = [
+            LeaderLease(f"{prefix}-{k}/{shards}", ttl, renew_interval, heartbeat=False) for k in range(shards)
+        ]
+        self.renew_interval = self.member.renew_interval
+        self._held = []
+        self._resigned = {}  # index shard -> monotonic; jangan diambil lagi sebelum lease lamanya expired
+        self._task = None
+
+    async def live_members(self):
+        row = await db.afetch_one(
+            "SELECT COUNT(*) AS n FROM leader_lease WHERE name LIKE %s AND expires_at > NOW()",
+            (f"{self.prefix}-member-%",),
+            primary=True,
+        )
+        return max(1, int(row["n"])) if row else 1
+
+    async def rebalance(self):
+        """Satu putaran: perpanjang member & shard yang dipegang, lepas kelebihan, ambil shard kosong."""
+        await self.member.try_acquire()
+        members = await self.live_members()
+        if members != self.members:
+            self.members = members
+            if self.on_members:
+                self.on_members(members)
+        fair = -(-self.shards // members)
+        held = [lease for lease in self.leases if lease.is_leader()]
+        now = time.monotonic()
+        for lease in held[fair:]:
+            lease.resign()
+            self._resigned[self.leases.index(lease)] = now + lease.ttl
+        self._resigned = {k: until for k, until in self._resigned.items() if until > now}
+        count = 0
+        for lease in held[:fair]:
+            if await lease.try_acquire():
+                count += 1
+        # offset acak biar instance yang barengan start gak rebutan shard yang sama
+        start = random.randrange(self.shards)
+        for i in range(self.shards):
+            if count >= fair:
+                break
+            k = (start + i) % self.shards
+            lease = self.leases[k]
+            if k in self._resigned or lease.is_leader():
+                continue
+            if await lease.try_acquire():
+                count += 1
+        held = [k for k, lease in enumerate(self.leases) if lease.is_leader()]
+        if held != self._held:
+            logger.info("Shard %s dipegang %s: %s (jatah %d)", self.prefix, INSTANCE_ID, held, fair)
+            self._held = held
+        return held
+
+    async def _run(self):
+        # row member instance yang mati tanpa release (crash/kill) dibersihin sekali pas start
+        try:
+            pruned = await db.arun_in_transaction(_prune, f"{self.prefix}-member-%")
+            if pruned:
+                logger.info("Hapus %d row member %s yang expired", pruned, self.prefix)
+        except db.DB_ERRORS as e:
+            logger.warning("Gagal bersihin member %s: %s", self.prefix, e)
+        while True:
+            try:
+                await self.rebalance()
+            except Exception as e:
+                logger.exception("Rebalance shard %s error: %s", self.prefix, e)
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def release(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for lease in self.leases:
+            await lease.release()
+        # nama member unik per proses -> row-nya dihapus, bukan cuma di-expire
+        await self.member.release(forget=True)
+
+
+_leases = {}
+_coordinators = []
+
+
+def get_lease(name="periodic"):
+    """Lease bernama (satu objek per nama per proses). Default "periodic" = semua job periodik bot."""
+    lease = _leases.get(name)
+    if lease is None:
+        lease = _leases[name] = LeaderLease(name)
+    return lease
+
+
+def get_coordinator(prefix, shards, on_members=None):
+    """ShardCoordinator buat `prefix` (satu per proses), dimulai lewat .start()."""
+    for coord in _coordinators:
+        if coord.prefix == prefix and coord.shards == shards:
+            return coord
+    coord = ShardCoordinator(prefix, shards, on_members=on_members)
+    _coordinators.append(coord)
+    return coord
+
+
+async def run_as_leader(job_name, name="periodic"):
+    """Buat cron yang jalan di semua instance: balikin True cuma di leader.
+
+    Standby nunggu maks satu periode takeover, jadi kalau leader mati pas jam job,
+    standby yang ngambil alih tetap jalanin job-nya.
+    """
+    lease = get_lease(name)
+    if await lease.wait_until_leader(timeout=lease.ttl + lease.renew_interval):
+        return True
+    logger.info("Skip %s: instance ini bukan leader", job_name)
+    return False
+
+
+async def release_all():
+    for coord in _coordinators:
+        await coord.release()
+    for lease in list(_leases.values()):
+        await lease.release()
@@ -6,6 +6,8 @@ from telegram.ext import (
     CallbackQueryHandler,
     ContextTypes,
     MessageHandler,
+    TypeHandler,
+    ApplicationHandlerStop,
     filters,
 )
 from config import TELEGRAM_API_KEY
@@ -14,6 +16,9 @@ import agenda1
 import keuangan
 import note
 import mood
+import leader
+import schema
+from db import is_degraded
 
 # Setup logging
 logging.basicConfig(
@@ -55,6 +60,25 @@ async def debug_logger(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("📩 Update masuk: %s", update.to_dict())
 
 
+# ===== DB down guard =====
+DB_DOWN_TEXT = "😣 Database lagi gangguan nih, master… coba lagi beberapa menit lagi ya."
+
+
+async def db_down_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Jalan sebelum semua handler: kalau circuit breaker DB open, bales sekali & stop di sini."""
+    if not is_degraded():
+        return
+    logger.warning("DB degraded, update %s ditolak", update.update_id)
+    try:
+        if update.callback_query:
+            await update.callback_query.answer(DB_DOWN_TEXT, show_alert=True)
+        elif update.effective_message:
+            await update.effective_message.reply_text(DB_DOWN_TEXT)
+    except Exception as e:
+        logger.warning("Gagal kirim pesan DB down: %s", e)
+    raise ApplicationHandlerStop
+
+
 # ===== Global error handler =====
 async def _error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.exception("Unhandled exception: %s", context.error)
@@ -64,6 +88,12 @@ async def _error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) ->
 async def on_startup(app):
     logger.info("🚀 Menjalankan startup semua fitur...")
 
+    try:
+        version = await schema.amigrate()
+        logger.info("✅ Skema DB versi %s", version)
+    except Exception as e:
+        logger.exception("❌ Migrasi skema gagal: %s", e)
+
     for feature in [agenda1, keuangan, note, mood]:
         if hasattr(feature, "on_startup"):
             try:
@@ -87,17 +117,28 @@ async def on_startup(app):
         logger.warning("⚠️ Gagal set commands: %s", e)
 
 
+# ===== Shutdown =====
+async def on_shutdown(app):
+    # lepas lease leader biar instance standby langsung ngambil alih job periodik
+    await leader.release_all()
+
+
 # ===== Build Application =====
 application = (
     ApplicationBuilder()
     .token(TELEGRAM_API_KEY)
     .post_init(on_startup)
+    .post_shutdown(on_shutdown)
     .build()
 )
 logger.info("Application object built")
 
 
 # ===== Register handlers =====
+# group -1 jalan duluan sebelum handler fitur (group 0)
+application.add_handler(TypeHandler(Update, db_down_guard), group=-1)
+logger.info("DB down guard registered")
+
 application.add_handler(CommandHandler("start", start))
 logger.info("Handler /start registered")
 
@@ -1,7 +1,6 @@
 # mood.py
 import logging
 import random
-import asyncio
 from datetime import date, datetime, timedelta
 from typing import List
 
@@ -21,8 +20,9 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from config import TELEGRAM_API_KEY
-from db import fetch_one, fetch_all, execute_query
+from db import afetch_one, afetch_all, afetch_keyset, aexecute_query, is_degraded
 from utils import now_wib, format_datetime
+import leader
 
 logger = logging.getLogger(__name__)
 
@@ -59,23 +59,25 @@ scheduler: AsyncIOScheduler = None
 # -----------------------
 # Utility DB helpers
 # -----------------------
-def ensure_user_in_mood_users(user):
+async def ensure_user_in_mood_users(user):
     """Simpan user ke mood_users table bila belum ada (dipakai untuk reminder list)."""
     q = "INSERT IGNORE INTO mood_users (user_id, username, first_name, created_at) VALUES (%s, %s, %s, %s)"
-    execute_query(q, (user.id, user.username or "", user.first_name or "", now_wib().strftime("%Y-%m-%d %H:%M:%S")))
+    await aexecute_query(q, (user.id, user.username or "", user.first_name or "", now_wib().strftime("%Y-%m-%d %H:%M:%S")))
 
 
-def user_has_mood_today(user_id: int, dt: date = None) -> bool:
+HAS_MOOD_QUERY = "SELECT 1 FROM moods WHERE user_id=%s AND date_only=%s LIMIT 1"
+
+
+async def user_has_mood_today(user_id: int, dt: date = None) -> bool:
     d = dt or now_wib().date()
-    q = "SELECT 1 FROM moods WHERE user_id=%s AND date_only=%s LIMIT 1"
-    r = fetch_one(q, (user_id, d))
+    r = await afetch_one(HAS_MOOD_QUERY, (user_id, d))
     return True if r else False
 
 
-def insert_mood(user, mood_key: str):
+async def insert_mood(user, mood_key: str):
     """Insert mood jika belum ada hari ini (return True kalau sukses, False kalau sudah ada)."""
     today = now_wib().date()
-    if user_has_mood_today(user.id, today):
+    if await user_has_mood_today(user.id, today):
         return False
     mood = MOOD_BY_KEY.get(mood_key)
     if not mood:
@@ -84,7 +86,7 @@ def insert_mood(user, mood_key: str):
     INSERT INTO moods (user_id, username, first_name, mood_key, mood_emoji, created_at, date_only)
     VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    execute_query(q, (
+    await aexecute_query(q, (
         user.id,
         user.username or "",
         user.first_name or "",
@@ -94,7 +96,7 @@ def insert_mood(user, mood_key: str):
         today
     ))
     # ensure user tracked for reminders
-    ensure_user_in_mood_users(user)
+    await ensure_user_in_mood_users(user)
     return True
 
 
@@ -206,11 +208,11 @@ async def cb_confirm_mood(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # choice == yes
-    if user_has_mood_today(user.id):
+    if await user_has_mood_today(user.id):
         await q.edit_message_text("Maaf master, mood untuk hari ini sudah tercatat. Cuma 1 mood per hari ya.")
         return
 
-    ok = insert_mood(user, mood_key)
+    ok = await insert_mood(user, mood_key)
     if ok:
         await q.edit_message_text("Oke master sayang, mood kamu sudah aku ingat ayang master hmphh 🥺🥺")
     else:
@@ -227,9 +229,9 @@ async def cb_delete_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     parts = q.data.split("|")
     if len(parts) >= 2 and parts[1] == "confirm":
         # Sesuai desain awal: hapus semua data (global)
-        execute_query("TRUNCATE TABLE moods")
+        await aexecute_query("TRUNCATE TABLE moods")
         # optionally clear mood_users too
-        execute_query("TRUNCATE TABLE mood_users")
+        await aexecute_query("TRUNCATE TABLE mood_users")
         await q.edit_message_text("Semua data mood berhasil dihapus. (bye bye sad memories)")
     else:
         await q.edit_message_text("Hapus dibatalkan.")
@@ -251,9 +253,25 @@ def last_n_months(n: int, from_dt: datetime):
     return months  # latest first
 
 
+def month_range(y: int, m: int):
+    """(awal bulan, awal bulan berikutnya) — filter range biar index date_only kepakai."""
+    start = date(y, m, 1)
+    end = date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1)
+    return start, end
+
+
 # -----------------------
 # List mood (monthly / yearly summary) - improved & formatted
 # -----------------------
+MONTH_SUMMARY_QUERY = """
+    SELECT mood_key, mood_emoji, COUNT(*) as cnt
+    FROM moods
+    WHERE date_only >= %s AND date_only < %s
+    GROUP BY mood_key, mood_emoji
+    ORDER BY cnt DESC
+"""
+
+
 async def show_list_menu(q, context: ContextTypes.DEFAULT_TYPE):
     """Menampilkan ringkasan mood: 5 bulan terakhir + total per tahun + detail bulan terbaru."""
     now = now_wib()
@@ -263,16 +281,7 @@ async def show_list_menu(q, context: ContextTypes.DEFAULT_TYPE):
     month_lines = []
     latest_month = None
     for (y, m) in months:
-        res = fetch_all(
-            """
-            SELECT mood_key, mood_emoji, COUNT(*) as cnt
-            FROM moods
-            WHERE YEAR(date_only)=%s AND MONTH(date_only)=%s
-            GROUP BY mood_key, mood_emoji
-            ORDER BY cnt DESC
-            """,
-            (y, m)
-        )
+        res = await afetch_all(MONTH_SUMMARY_QUERY, month_range(y, m))
         ym_label = f"{y}-{m:02d}"
         if not res:
             month_lines.append((ym_label, None))  # None means empty
@@ -286,7 +295,7 @@ async def show_list_menu(q, context: ContextTypes.DEFAULT_TYPE):
             latest_month = (y, m)
 
     # Yearly totals (limit show to 5 most recent years present)
-    year_rows = fetch_all(
+    year_rows = await afetch_all(
         """
         SELECT YEAR(date_only) as yr, COUNT(*) as cnt
         FROM moods
@@ -319,14 +328,15 @@ async def show_list_menu(q, context: ContextTypes.DEFAULT_TYPE):
     # Detail month (latest month) — show daily entries (latest first) max 12
     if latest_month:
         yy, mm = latest_month
-        detail_rows = fetch_all(
+        detail_rows = await afetch_all(
             """
             SELECT date_only, mood_emoji, mood_key
             FROM moods
-            WHERE YEAR(date_only)=%s AND MONTH(date_only)=%s
+            WHERE date_only >= %s AND date_only < %s
             ORDER BY date_only DESC
+            LIMIT 12
             """,
-            (yy, mm)
+            month_range(yy, mm)
         )
         if detail_rows:
             # human-friendly month name
@@ -352,7 +362,7 @@ async def show_list_menu(q, context: ContextTypes.DEFAULT_TYPE):
             pass
 
     # Motivasi berdasarkan top overall mood
-    top_overall = fetch_one(
+    top_overall = await afetch_one(
         "SELECT mood_key, mood_emoji, COUNT(*) as cnt FROM moods GROUP BY mood_key, mood_emoji ORDER BY cnt DESC LIMIT 1"
     )
     if top_overall:
@@ -396,26 +406,44 @@ def random_motivasi_for_mood(mood_key: str) -> str:
 # -----------------------
 # Scheduler jobs
 # -----------------------
+# user yang belum isi mood di tanggal itu, satu halaman keyset (user_id) — langsung anti-join, gak cek per user
+UNFILLED_USERS_QUERY = """
+    SELECT u.user_id, u.username, u.first_name FROM mood_users u
+    WHERE NOT EXISTS (SELECT 1 FROM moods m WHERE m.user_id = u.user_id AND m.date_only = %s)
+    AND u.user_id > %s ORDER BY u.user_id LIMIT %s
+"""
+
+
 async def job_remind_unfilled(bot):
     """Kirim reminder ke semua pengguna yang belum isi mood hari ini (pukul 19:00 WIB)."""
-    today = now_wib().date()
-    users = fetch_all("SELECT user_id, username, first_name FROM mood_users")
-    if not users:
+    if not await leader.run_as_leader("reminder mood"):
+        return
+    if is_degraded():
+        logger.warning("DB lagi down, skip reminder mood hari ini")
         return
-    for u in users:
+    today = now_wib().date()
+    # per halaman keyset: gak ada koneksi DB yang kepegang selama nunggu send_message
+    async for u in afetch_keyset(UNFILLED_USERS_QUERY, "user_id", 0, (today,), rows="record"):
         uid = u["user_id"]
-        if not user_has_mood_today(uid, today):
-            try:
-                kb = InlineKeyboardMarkup([[InlineKeyboardButton("Isi Mood Sekarang 📝", callback_data=f"{CB_PREFIX_MENU}|add")]])
-                await bot.send_message(chat_id=uid,
-                                       text="Hai master, kamu belum isi mood hari ini nih. Isi ya biar aku ingat. Hmphh baka tapi aku sayang 🥰",
-                                       reply_markup=kb)
-            except Exception as e:
-                logger.warning("Gagal kirim reminder ke %s: %s", uid, e)
+        try:
+            kb = InlineKeyboardMarkup([[InlineKeyboardButton("Isi Mood Sekarang 📝", callback_data=f"{CB_PREFIX_MENU}|add")]])
+            await bot.send_message(chat_id=uid,
+                                   text="Hai master, kamu belum isi mood hari ini nih. Isi ya biar aku ingat. Hmphh baka tapi aku sayang 🥰",
+                                   reply_markup=kb)
+        except Exception as e:
+            logger.warning("Gagal kirim reminder ke %s: %s", uid, e)
+
 
+DELETE_OLD_MOODS_QUERY = "DELETE FROM moods WHERE date_only < %s"
 
-def delete_old_months_job():
+
+async def delete_old_months_job():
     """Delete months older than 5 months from now (run at 00:00 WIB)."""
+    if not await leader.run_as_leader("cleanup mood"):
+        return
+    if is_degraded():
+        logger.warning("DB lagi down, skip cleanup mood (dicoba lagi besok)")
+        return
     # compute cutoff date = first day of month, 5 months ago
     now = now_wib()
     # compute start of current month
@@ -430,8 +458,16 @@ def delete_old_months_job():
         m += 12
         y -= 1
     cutoff = date(y, m, 1)  # any date < cutoff will be removed
-    q = "DELETE FROM moods WHERE date_only < %s"
-    execute_query(q, (cutoff,))
+    await aexecute_query(DELETE_OLD_MOODS_QUERY, (cutoff,))
+
+
+# query hot path buat EXPLAIN check (python schema.py)
+HOT_QUERIES = [
+    ("user_has_mood_today", HAS_MOOD_QUERY, (1, "2025-01-01")),
+    ("job_remind_unfilled", UNFILLED_USERS_QUERY, ("2025-01-01", 0, 500)),
+    ("show_list_menu (bulan)", MONTH_SUMMARY_QUERY, ("2025-01-01", "2025-02-01")),
+    ("delete_old_months_job", DELETE_OLD_MOODS_QUERY, ("2025-01-01",)),
+]
 
 
 # -----------------------
@@ -444,8 +480,9 @@ async def on_startup(app: Application):
         scheduler = AsyncIOScheduler(timezone="Asia/Jakarta")
     # schedule daily reminder at 19:00 WIB
     try:
-        # use asyncio.create_task to run coroutine safely from scheduler
-        scheduler.add_job(lambda: asyncio.create_task(job_remind_unfilled(app.bot)),
+        # coroutine job langsung di-await di event loop oleh AsyncIOScheduler
+        scheduler.add_job(job_remind_unfilled,
+                          args=[app.bot],
                           trigger=CronTrigger(hour=19, minute=0, timezone="Asia/Jakarta"),
                           id="mood_reminder_19",
                           replace_existing=True)
@@ -453,12 +490,14 @@ async def on_startup(app: Application):
         logger.exception("Gagal tambahkan job reminder 19:00")
     # schedule maintenance at 00:00 WIB (delete old months)
     try:
-        scheduler.add_job(lambda: delete_old_months_job(),
+        scheduler.add_job(delete_old_months_job,
                           trigger=CronTrigger(hour=0, minute=0, timezone="Asia/Jakarta"),
                           id="mood_maintenance_midnight",
                           replace_existing=True)
     except Exception:
         logger.exception("Gagal tambahkan job maintenance 00:00")
+    # heartbeat lease dari awal biar standby siap ngambil alih
+    leader.get_lease().start()
     # start scheduler
     try:
         scheduler.start()
@@ -14,7 +14,7 @@ from telegram.ext import (
 
 # === DB & Utils (pakai helper) ===
 from utils import now_wib, get_current_time, format_datetime
-from db import fetch_all, fetch_one, execute_query
+from db import afetch_all, afetch_one, aexecute_query
 
 logger = logging.getLogger(__name__)
 
@@ -69,21 +69,32 @@ def kb_delete_one_page(items):
 
 
 # ===== DB Helpers =====
-def _count_notes(user_id: int) -> int:
-    row = fetch_one("SELECT COUNT(*) AS total FROM quick_notes WHERE user_id=%s", (user_id,))
+COUNT_NOTES_QUERY = "SELECT COUNT(*) AS total FROM quick_notes WHERE user_id=%s"
+NOTES_PAGE_QUERY = (
+    "SELECT id, note_text, day_name, created_at "
+    "FROM quick_notes WHERE user_id=%s "
+    "ORDER BY created_at DESC LIMIT %s OFFSET %s"
+)
+DELETE_ALL_NOTES_QUERY = "DELETE FROM quick_notes WHERE user_id=%s"
+
+# buat EXPLAIN check (python schema.py)
+HOT_QUERIES = [
+    ("_count_notes", COUNT_NOTES_QUERY, (1,)),
+    ("_fetch_notes_page", NOTES_PAGE_QUERY, (1, 10, 0)),
+    ("_delete_all", DELETE_ALL_NOTES_QUERY, (1,)),
+]
+
+
+async def _count_notes(user_id: int) -> int:
+    row = await afetch_one(COUNT_NOTES_QUERY, (user_id,))
     return int(row["total"]) if row else 0
 
 
-def _fetch_notes_page(user_id: int, page: int, limit: int = PAGE_LIMIT):
+async def _fetch_notes_page(user_id: int, page: int, limit: int = PAGE_LIMIT):
     offset = (page - 1) * limit
     try:
         return (
-            fetch_all(
-                "SELECT id, note_text, day_name, created_at "
-                "FROM quick_notes WHERE user_id=%s "
-                "ORDER BY created_at DESC LIMIT %s OFFSET %s",
-                (user_id, limit, offset),
-            )
+            await afetch_all(NOTES_PAGE_QUERY, (user_id, limit, offset))
             or []
         )
     except Exception as e:
@@ -91,11 +102,11 @@ def _fetch_notes_page(user_id: int, page: int, limit: int = PAGE_LIMIT):
         return []
 
 
-def _insert_note(user_id: int, text: str) -> bool:
+async def _insert_note(user_id: int, text: str) -> bool:
     now = now_wib()
     _, day_indo = get_current_time()
     try:
-        return execute_query(
+        return await aexecute_query(
             "INSERT INTO quick_notes (user_id, note_text, day_name, created_at) "
             "VALUES (%s,%s,%s,%s)",
             (user_id, text, day_indo, now),
@@ -105,17 +116,17 @@ def _insert_note(user_id: int, text: str) -> bool:
         return False
 
 
-def _delete_one(user_id: int, note_id: int) -> bool:
+async def _delete_one(user_id: int, note_id: int) -> bool:
     try:
-        return execute_query("DELETE FROM quick_notes WHERE id=%s AND user_id=%s", (note_id, user_id))
+        return await aexecute_query("DELETE FROM quick_notes WHERE id=%s AND user_id=%s", (note_id, user_id))
     except Exception as e:
         logger.exception("Delete one note error: %s", e)
         return False
 
 
-def _delete_all(user_id: int) -> bool:
+async def _delete_all(user_id: int) -> bool:
     try:
-        return execute_query("DELETE FROM quick_notes WHERE user_id=%s", (user_id,))
+        return await aexecute_query(DELETE_ALL_NOTES_QUERY, (user_id,))
     except Exception as e:
         logger.exception("Delete all notes error: %s", e)
         return False
@@ -212,7 +223,7 @@ async def note_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     ok = False
     try:
-        ok = _insert_note(uid, text)
+        ok = await _insert_note(uid, text)
     except Exception as e:
         logger.exception("Unexpected error while inserting note: %s", e)
 
@@ -235,10 +246,10 @@ async def note_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cb_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 1):
     q = update.callback_query
     await q.answer()
-    total = _count_notes(q.from_user.id)
+    total = await _count_notes(q.from_user.id)
     total_pages = max(1, math.ceil(total / PAGE_LIMIT))
     page = max(1, min(page, total_pages))
-    items = _fetch_notes_page(q.from_user.id, page)
+    items = await _fetch_notes_page(q.from_user.id, page)
     await q.edit_message_text(
         _render_note_list_text(items, page, total),
         reply_markup=kb_pagination("list", page, total_pages),
@@ -248,10 +259,10 @@ async def cb_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int
 async def cb_del1_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 1):
     q = update.callback_query
     await q.answer()
-    total = _count_notes(q.from_user.id)
+    total = await _count_notes(q.from_user.id)
     total_pages = max(1, math.ceil(total / PAGE_LIMIT))
     page = max(1, min(page, total_pages))
-    items = _fetch_notes_page(q.from_user.id, page)
+    items = await _fetch_notes_page(q.from_user.id, page)
     if not items:
         await q.edit_message_text("Belum ada catatan untuk dihapus.", reply_markup=kb_main_menu())
         return
@@ -262,7 +273,7 @@ async def cb_del1_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, page:
 async def cb_del1_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE, note_id: int):
     q = update.callback_query
     await q.answer()
-    ok = _delete_one(q.from_user.id, note_id)
+    ok = await _delete_one(q.from_user.id, note_id)
     await q.edit_message_text("✅ Sukses hapus!" if ok else "❌ Gagal hapus!", reply_markup=kb_main_menu())
 
 
@@ -283,7 +294,7 @@ async def cb_delall_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cb_delall_yes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
-    ok = _delete_all(q.from_user.id)
+    ok = await _delete_all(q.from_user.id)
     await q.edit_message_text("Semua catatan sudah dihapus!" if ok else "Gagal menghapus semua.", reply_markup=kb_main_menu())
 
 
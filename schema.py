@@ -0,0 +1,406 @@
+# schema.py
+# Skema DB + migrasi berversi. Versi yang sudah jalan dicatat di tabel schema_version,
+# jadi startup cuma butuh satu SELECT kalau skema sudah up to date.
+import importlib
+import logging
+import re
+import sys
+
+import db
+from config import KEUANGAN_LEGACY_OWNER
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Step helpers
+# -----------------------
+_RE_AUTO_PK = re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.IGNORECASE)
+_RE_UNIQUE_KEY = re.compile(r"\bUNIQUE\s+KEY\s+(?:\w+\s*)?\(", re.IGNORECASE)
+_RE_TABLE_OPTIONS = re.compile(r"\)\s*ENGINE\s*=[^;]*$", re.IGNORECASE)
+
+
+def ddl(sql):
+    """DDL ditulis dialek MySQL; diterjemahin kalau backend aktif SQLite."""
+    if db.get_backend().name != "sqlite":
+        return sql
+    sql = _RE_AUTO_PK.sub("INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+    sql = _RE_UNIQUE_KEY.sub("UNIQUE (", sql)
+    return _RE_TABLE_OPTIONS.sub(")", sql.strip())
+
+
+def create_index(table, name, columns, unique=False):
+    """Step migrasi: bikin index kalau belum ada (MySQL gak punya CREATE INDEX IF NOT EXISTS)."""
+    def step(tx):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        if db.get_backend().name == "sqlite":
+            tx.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})")
+            return
+        exists = tx.fetch_one(
+            "SELECT 1 AS ada FROM information_schema.statistics "
+            "WHERE table_schema=DATABASE() AND table_name=%s AND index_name=%s LIMIT 1",
+            (table, name),
+        )
+        if exists:
+            return
+        tx.execute(f"CREATE {kind} {name} ON {table} ({columns})")
+    step.__name__ = f"index {table}.{name}"
+    return step
+
+
+def add_column(table, column, definition):
+    """Step migrasi: tambah kolom kalau belum ada (MySQL & SQLite gak punya ADD COLUMN IF NOT EXISTS)."""
+    def step(tx):
+        if db.get_backend().name == "sqlite":
+            exists = any(r["name"] == column for r in tx.fetch_all(f"PRAGMA table_info({table})"))
+        else:
+            exists = tx.fetch_one(
+                "SELECT 1 AS ada FROM information_schema.columns "
+                "WHERE table_schema=DATABASE() AND table_name=%s AND column_name=%s LIMIT 1",
+                (table, column),
+            )
+        if exists:
+            return
+        tx.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    step.__name__ = f"column {table}.{column}"
+    return step
+
+
+def _claim_legacy_keuangan(tx):
+    """Data keuangan lama (user_id 0) dipindah ke KEUANGAN_LEGACY_OWNER kalau di-set."""
+    owner = KEUANGAN_LEGACY_OWNER
+    if not owner:
+        return
+    for table in ("tabungan", "pakai_tabungan", "pengeluaran", "keuangan_ledger"):
+        tx.execute(f"UPDATE {table} SET user_id=%s WHERE user_id=0", (owner,))
+    # row saldo 0 jadi milik owner (kalau owner belum punya row sendiri)
+    if not tx.fetch_one("SELECT 1 AS ada FROM keuangan_saldo WHERE user_id=%s", (owner,)):
+        tx.execute("UPDATE keuangan_saldo SET user_id=%s WHERE user_id=0", (owner,))
+
+
+# -----------------------
+# Migrasi (urut, append-only — jangan ubah migrasi yang sudah rilis)
+# -----------------------
+MIGRATIONS = [
+    (1, "tabel dasar", [
+        """
+        CREATE TABLE IF NOT EXISTS user (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            username VARCHAR(64) NULL,
+            first_name VARCHAR(128) NULL,
+            created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_user_telegram (telegram_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS agenda_penting (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            nama_agenda VARCHAR(255) NOT NULL,
+            deadline DATETIME NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'aktif'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS agenda_reminder (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agenda_id INT NOT NULL,
+            last_sent TIMESTAMP NULL DEFAULT NULL,
+            stage VARCHAR(30) NULL,
+            UNIQUE KEY (agenda_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS quick_notes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            note_text TEXT NOT NULL,
+            day_name VARCHAR(16) NULL,
+            created_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS moods (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            username VARCHAR(64) NULL,
+            first_name VARCHAR(128) NULL,
+            mood_key VARCHAR(16) NOT NULL,
+            mood_emoji VARCHAR(16) NULL,
+            created_at DATETIME NOT NULL,
+            date_only DATE NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mood_users (
+            user_id BIGINT PRIMARY KEY,
+            username VARCHAR(64) NULL,
+            first_name VARCHAR(128) NULL,
+            created_at DATETIME NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tabungan (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tanggal DATETIME NOT NULL,
+            nominal BIGINT NOT NULL,
+            keterangan VARCHAR(255) NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS pakai_tabungan (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tanggal DATETIME NOT NULL,
+            nominal BIGINT NOT NULL,
+            keterangan VARCHAR(255) NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS pengeluaran (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tanggal DATETIME NOT NULL,
+            kategori VARCHAR(64) NOT NULL,
+            deskripsi VARCHAR(255) NULL,
+            nominal BIGINT NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (2, "index hot path", [
+        # reminder_loop & pagination per status
+        create_index("agenda_penting", "idx_agenda_status_deadline", "status, deadline, id"),
+        # agenda per user (delete all, picker per user)
+        create_index("agenda_penting", "idx_agenda_user_status_deadline", "user_id, status, deadline, id"),
+        create_index("quick_notes", "idx_notes_user_created", "user_id, created_at"),
+        create_index("moods", "idx_moods_user_date", "user_id, date_only"),
+        # ringkasan bulanan & hapus bulan lama
+        create_index("moods", "idx_moods_date", "date_only"),
+        create_index("tabungan", "idx_tabungan_tanggal", "tanggal"),
+        create_index("pakai_tabungan", "idx_pakai_tanggal", "tanggal"),
+        create_index("pengeluaran", "idx_pengeluaran_tanggal", "tanggal"),
+    ]),
+    (3, "index picker hapus agenda per user", [
+        # picker hapus: semua status milik user, urut deadline (keyset deadline, id)
+        create_index("agenda_penting", "idx_agenda_user_deadline", "user_id, deadline, id"),
+    ]),
+    (4, "lease leader election", [
+        """
+        CREATE TABLE IF NOT EXISTS leader_lease (
+            name VARCHAR(64) PRIMARY KEY,
+            holder VARCHAR(128) NOT NULL,
+            expires_at DATETIME NOT NULL,
+            heartbeat_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (5, "saldo tabungan keuangan (incremental)", [
+        # total per pemilik, di-update di transaksi yang sama dengan insert tabungan/pakai_tabungan
+        """
+        CREATE TABLE IF NOT EXISTS keuangan_saldo (
+            user_id BIGINT PRIMARY KEY,
+            total_tabungan BIGINT NOT NULL DEFAULT 0,
+            total_pakai BIGINT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        # backfill dari data lama (data keuangan belum per user -> pemilik 0)
+        """
+        INSERT IGNORE INTO keuangan_saldo (user_id, total_tabungan, total_pakai)
+        SELECT 0, (SELECT COALESCE(SUM(nominal), 0) FROM tabungan),
+               (SELECT COALESCE(SUM(nominal), 0) FROM pakai_tabungan)
+        """,
+    ]),
+    (6, "total pengeluaran di keuangan_saldo", [
+        add_column("keuangan_saldo", "total_pengeluaran", "BIGINT NOT NULL DEFAULT 0"),
+        """
+        UPDATE keuangan_saldo SET total_pengeluaran = (SELECT COALESCE(SUM(nominal), 0) FROM pengeluaran)
+        WHERE user_id = 0
+        """,
+    ]),
+    (7, "ledger keuangan gabungan + jumlah transaksi", [
+        # satu row per transaksi tabungan/pakai_tabungan/pengeluaran, ditulis bareng insert aslinya
+        """
+        CREATE TABLE IF NOT EXISTS keuangan_ledger (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id BIGINT NOT NULL DEFAULT 0,
+            jenis VARCHAR(16) NOT NULL,
+            ref_id INT NOT NULL,
+            tanggal DATETIME NOT NULL,
+            nominal BIGINT NOT NULL,
+            note VARCHAR(330) NULL,
+            UNIQUE KEY uq_ledger_ref (jenis, ref_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        # riwayat per pemilik, keyset (tanggal, id)
+        create_index("keuangan_ledger", "idx_ledger_user_tanggal", "user_id, tanggal, id"),
+        """
+        INSERT IGNORE INTO keuangan_ledger (user_id, jenis, ref_id, tanggal, nominal, note)
+        SELECT 0, 'Tabungan', id, tanggal, nominal, keterangan FROM tabungan
+        """,
+        """
+        INSERT IGNORE INTO keuangan_ledger (user_id, jenis, ref_id, tanggal, nominal, note)
+        SELECT 0, 'PakaiTabungan', id, tanggal, nominal, keterangan FROM pakai_tabungan
+        """,
+        """
+        INSERT IGNORE INTO keuangan_ledger (user_id, jenis, ref_id, tanggal, nominal, note)
+        SELECT 0, 'Pengeluaran', id, tanggal, nominal, COALESCE(CONCAT(kategori, ': ', deskripsi), kategori)
+        FROM pengeluaran
+        """,
+        add_column("keuangan_saldo", "jumlah_transaksi", "BIGINT NOT NULL DEFAULT 0"),
+        """
+        UPDATE keuangan_saldo SET jumlah_transaksi = (SELECT COUNT(*) FROM keuangan_ledger WHERE user_id = 0)
+        WHERE user_id = 0
+        """,
+    ]),
+    (8, "data keuangan per user", [
+        # user_id = telegram id (sama kayak quick_notes/moods); row lama -> 0 lalu diklaim legacy owner
+        add_column("tabungan", "user_id", "BIGINT NOT NULL DEFAULT 0"),
+        add_column("pakai_tabungan", "user_id", "BIGINT NOT NULL DEFAULT 0"),
+        add_column("pengeluaran", "user_id", "BIGINT NOT NULL DEFAULT 0"),
+        create_index("tabungan", "idx_tabungan_user_tanggal", "user_id, tanggal"),
+        create_index("pakai_tabungan", "idx_pakai_user_tanggal", "user_id, tanggal"),
+        create_index("pengeluaran", "idx_pengeluaran_user_tanggal", "user_id, tanggal"),
+        _claim_legacy_keuangan,
+    ]),
+    (9, "rollup pengeluaran per bulan per kategori", [
+        # bulan = YYYYMM (INT); di-upsert bareng insert pengeluaran, di-rebuild job rekonsiliasi
+        """
+        CREATE TABLE IF NOT EXISTS keuangan_rollup (
+            user_id BIGINT NOT NULL,
+            bulan INT NOT NULL,
+            kategori VARCHAR(64) NOT NULL,
+            total BIGINT NOT NULL DEFAULT 0,
+            jumlah INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, bulan, kategori)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        INSERT IGNORE INTO keuangan_rollup (user_id, bulan, kategori, total, jumlah)
+        SELECT user_id, YEAR(tanggal) * 100 + MONTH(tanggal), kategori, SUM(nominal), COUNT(*)
+        FROM pengeluaran GROUP BY user_id, YEAR(tanggal) * 100 + MONTH(tanggal), kategori
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+_current = None  # versi yang sudah dicek di proses ini
+
+
+def current_version():
+    """Versi skema di DB (0 kalau tabel schema_version belum ada)."""
+    try:
+        with db.transaction() as tx:
+            row = tx.fetch_one("SELECT MAX(version) AS v FROM schema_version")
+    except db.DB_ERRORS:
+        return 0
+    return int(row["v"] or 0) if row else 0
+
+
+def migrate():
+    """Jalankan migrasi yang belum diterapkan. Balikin versi akhir."""
+    global _current
+    if _current == LATEST_VERSION:
+        return _current
+
+    version = current_version()
+    if version >= LATEST_VERSION:
+        _current = version
+        return version
+
+    db.execute_query(ddl(_VERSION_TABLE))
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("Migrasi skema v%s: %s", number, description)
+        # DDL MySQL auto-commit per statement (SQLite transaksional); semua step idempotent jadi aman diulang
+        with db.transaction() as tx:
+            for step in steps:
+                if callable(step):
+                    step(tx)
+                else:
+                    tx.execute(ddl(step))
+            tx.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (number, description),
+            )
+        version = number
+    _current = version
+    return version
+
+
+async def amigrate():
+    """Versi async migrate() (jalan di thread DB)."""
+    return await db.run_sync(migrate)
+
+
+# -----------------------
+# EXPLAIN check untuk query hot path di modul fitur
+# -----------------------
+# tiap modul fitur punya HOT_QUERIES sendiri yang dibangun dari konstanta query yang beneran dipakai
+# (bukan salinan). Di-import pas dicek aja: agenda1 sendiri import schema.
+HOT_QUERY_MODULES = ("agenda1", "note", "mood", "keuangan")
+
+
+def hot_queries():
+    """Kumpulin (nama, query, params) dari HOT_QUERIES semua modul fitur."""
+    found = []
+    for module_name in HOT_QUERY_MODULES:
+        module = importlib.import_module(module_name)
+        found.extend((f"{module_name}.{name}", query, params) for name, query, params in module.HOT_QUERIES)
+    return found
+
+
+def _unindexed_mysql(tx, query, params):
+    bad = []
+    for row in tx.fetch_all("EXPLAIN " + query, params):
+        table = row.get("table") or ""
+        if table.startswith("<"):  # hasil derived/union, bukan tabel fisik
+            continue
+        if not row.get("key"):
+            bad.append((table, row.get("type")))
+    return bad
+
+
+def _unindexed_sqlite(tx, query, params):
+    bad = []
+    derived = set()  # hasil subquery di FROM (CO-ROUTINE/MATERIALIZE), bukan tabel fisik
+    for row in tx.fetch_all("EXPLAIN QUERY PLAN " + query, params):
+        detail = row.get("detail") or ""
+        if detail.startswith(("CO-ROUTINE", "MATERIALIZE")):
+            derived.add(detail.split()[1])
+            continue
+        # "SCAN t" tanpa "USING ... INDEX" = full table scan
+        if detail.startswith("SCAN") and "INDEX" not in detail and "SUBQUERY" not in detail:
+            if detail.split()[1] not in derived:
+                bad.append((detail.split()[1], detail))
+    return bad
+
+
+def check_hot_query_indexes():
+    """EXPLAIN tiap hot query modul fitur; balikin list (nama, tabel, detail) yang gak pakai index."""
+    explain = _unindexed_sqlite if db.get_backend().name == "sqlite" else _unindexed_mysql
+    problems = []
+    for name, query, params in hot_queries():
+        with db.transaction() as tx:
+            for table, detail in explain(tx, query, params):
+                problems.append((name, table, detail))
+    return problems
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Skema versi {migrate()} (terbaru {LATEST_VERSION})")
+    bad = check_hot_query_indexes()
+    for name, table, access in bad:
+        print(f"[NO INDEX] {name}: tabel {table} ({access})")
+    if bad:
+        sys.exit(1)
+    print("Semua hot query pakai index ✅")
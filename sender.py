@@ -0,0 +1,143 @@
+# ===== sender.py =====
+# Kirim banyak pesan bot sekaligus (reminder massal) tanpa nabrak rate limit Telegram.
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from config import SEND_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# hasil per pesan
+DELIVERED = "delivered"
+PERMANENT = "permanent"  # gak bakal pernah sukses (bot diblokir, chat gak ada) -> jangan dicoba lagi
+FAILED = "failed"  # gagal sementara (network/timeout) -> boleh dicoba lagi tick berikutnya
+
+OutgoingMessage = namedtuple("OutgoingMessage", "key chat_id text kwargs")
+
+
+def _seconds(value):
+    # PTB bisa ngasih retry_after sebagai int detik atau timedelta
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+class RateLimiter:
+    """Token bucket global (pesan/detik) + jarak minimal antar pesan ke chat yang sama.
+
+    RetryAfter dari Telegram nge-pause semua pengiriman selama waktu yang diminta.
+    """
+
+    def __init__(self, rate=25.0, per_chat_interval=1.0, burst=None):
+        self.rate = rate
+        self.burst = burst
+        self.capacity = burst or max(1.0, rate)
+        self.per_chat_interval = per_chat_interval
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._chat_next = {}
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        """Ganti rate di tengah jalan (jatah proses ini berubah); token lebih dari kapasitas baru dibuang."""
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.capacity = self.burst or max(1.0, rate)
+        self._tokens = min(self._tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Stop semua pengiriman selama `seconds` (dipanggil pas kena RetryAfter)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat_id):
+        """Tunggu sampai boleh kirim ke chat_id."""
+        now = time.monotonic()
+        if len(self._chat_next) > 4096:
+            self._chat_next = {cid: t for cid, t in self._chat_next.items() if t > now}
+        # slot per chat dipesan duluan biar pesan ke chat yang sama antre rapi
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_limiter = None
+
+
+def get_limiter():
+    """Limiter global bot (dibagi semua fitur yang kirim massal)."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            rate=SEND_CONFIG["rate_per_sec"],
+            per_chat_interval=SEND_CONFIG["per_chat_interval"],
+        )
+    return _limiter
+
+
+def set_rate_share(share):
+    """Proses ini cuma boleh pakai `share` (0-1) dari SEND_RATE_PER_SEC: limit Telegram per bot, bukan per proses."""
+    get_limiter().set_rate(SEND_CONFIG["rate_per_sec"] * share)
+
+
+async def _send_one(bot, msg, limiter, stats):
+    max_retries = SEND_CONFIG["max_retries"]
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(msg.chat_id)
+        try:
+            await bot.send_message(chat_id=msg.chat_id, text=msg.text, **msg.kwargs)
+            stats[DELIVERED] += 1
+            return DELIVERED
+        except RetryAfter as e:
+            stats["throttled"] += 1
+            limiter.pause(_seconds(e.retry_after))
+            logger.warning("Kena flood limit Telegram, pause %ss", e.retry_after)
+        except (Forbidden, BadRequest) as e:
+            # BadRequest turunan NetworkError, jadi harus ditangkep sebelum except umum
+            logger.warning("Gagal kirim ke %s (permanen): %s", msg.chat_id, e)
+            stats[PERMANENT] += 1
+            return PERMANENT
+        except Exception as e:
+            logger.warning("Gagal kirim ke %s (percobaan %d): %s", msg.chat_id, attempt + 1, e)
+            if attempt < max_retries:
+                await asyncio.sleep(min(2 ** attempt, 10))
+    stats[FAILED] += 1
+    return FAILED
+
+
+async def send_all(bot, messages, concurrency=None, limiter=None):
+    """Kirim semua OutgoingMessage paralel (maks `concurrency` sekaligus) lewat rate limiter.
+
+    Balikin (hasil per key, stats) — stats: delivered, permanent, failed, throttled, elapsed.
+    """
+    limiter = limiter or get_limiter()
+    sem = asyncio.Semaphore(concurrency or SEND_CONFIG["concurrency"])
+    stats = {DELIVERED: 0, PERMANENT: 0, FAILED: 0, "throttled": 0}
+    results = {}
+    started = time.monotonic()
+
+    async def worker(msg):
+        async with sem:
+            results[msg.key] = await _send_one(bot, msg, limiter, stats)
+
+    await asyncio.gather(*(worker(m) for m in messages))
+    stats["elapsed"] = round(time.monotonic() - started, 3)
+    return results, stats
@@ -0,0 +1,42 @@
+# Test jalan di SQLite sementara (DB_BACKEND=sqlite), jadi gak butuh server MySQL.
+# Env harus di-set sebelum config/db ke-import, makanya ditaruh paling atas.
+import os
+import sys
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="bot-test-")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_TMP_DIR, "test.db")
+os.environ.setdefault("TELEGRAM_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import db  # noqa: E402
+import schema  # noqa: E402
+
+# urutan anak dulu baru induk; schema_version dibiarin biar migrasi gak diulang
+TABLES = [
+    "agenda_reminder", "agenda_penting", "quick_notes", "moods", "mood_users",
+    "pakai_tabungan", "tabungan", "pengeluaran", "keuangan_ledger", "keuangan_rollup",
+    "keuangan_saldo", "leader_lease", "user",
+]
+
+
+@pytest.fixture
+def fresh_db():
+    """DB kosong (skema terbaru) buat satu test."""
+    schema.migrate()
+    with db.transaction() as tx:
+        for table in TABLES:
+            tx.execute(f"DELETE FROM {table}")
+    db.reset_query_stats()
+    yield db
+
+
+def add_users(telegram_ids):
+    """Daftarin user, balikin {telegram_id: user.id}."""
+    db.execute_many("INSERT INTO user (telegram_id, username) VALUES (%s, %s)",
+                    [(tid, f"u{tid}") for tid in telegram_ids])
+    rows = db.fetch_all("SELECT id, telegram_id FROM user")
+    return {r["telegram_id"]: r["id"] for r in rows}
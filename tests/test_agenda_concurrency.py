@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import agenda1
+from conftest import add_users
+
+USERS = [1001, 1002, 1003, 1004]
+PER_USER = 50
+
+
+def test_parallel_create_agenda_ids_match_rows(fresh_db):
+    """Insert agenda barengan lewat arun_in_transaction: tiap id yang balik harus nunjuk ke row miliknya."""
+    add_users(USERS)
+    deadline = datetime.now().replace(microsecond=0) + timedelta(days=3)
+    jobs = [(tid, f"agenda-{tid}-{i}") for i in range(PER_USER) for tid in USERS]
+
+    async def run():
+        return await asyncio.gather(*(
+            fresh_db.arun_in_transaction(agenda1._create_agenda, tid, nama, deadline)
+            for tid, nama in jobs
+        ))
+
+    ids = asyncio.run(run())
+
+    assert None not in ids
+    assert len(set(ids)) == len(jobs)
+
+    rows = fresh_db.fetch_all(
+        "SELECT a.id, a.nama_agenda, u.telegram_id, r.agenda_id AS reminder_id "
+        "FROM agenda_penting a JOIN user u ON u.id = a.user_id "
+        "LEFT JOIN agenda_reminder r ON r.agenda_id = a.id"
+    )
+    by_id = {r["id"]: r for r in rows}
+    assert len(rows) == len(jobs)
+    for agenda_id, (tid, nama) in zip(ids, jobs):
+        row = by_id[agenda_id]
+        assert row["nama_agenda"] == nama
+        assert row["telegram_id"] == tid
+        assert row["reminder_id"] == agenda_id
+
+
+def test_create_agenda_unknown_user(fresh_db):
+    assert fresh_db.run_in_transaction(agenda1._create_agenda, 999, "x", datetime.now()) is None
+    assert fresh_db.fetch_all("SELECT id FROM agenda_penting") == []
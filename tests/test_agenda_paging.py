@@ -0,0 +1,78 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import agenda1
+from conftest import add_users
+
+N_USERS = 1000
+# rata-rata 10 agenda per user -> 10k agenda; ada user yang cuma 1 row, ada yang 2 halaman
+COUNTS = [1, 5, 10, 15, 19]
+BASE = datetime(2030, 1, 1, 8, 0)
+
+
+def _seed(db):
+    users = add_users(range(5000, 5000 + N_USERS))
+    rows = []
+    for i, user_id in enumerate(users.values()):
+        for j in range(COUNTS[i % len(COUNTS)]):
+            # deadline sengaja banyak yang kembar biar tie-break id ikut kepake
+            status = "selesai" if j % 4 == 3 else "aktif"
+            rows.append((user_id, f"u{user_id}-{j}", BASE + timedelta(hours=j // 3), status))
+    # urutan insert diacak biar id gak searah deadline
+    random.Random(16).shuffle(rows)
+    db.execute_many(
+        "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, %s)", rows
+    )
+    return users
+
+
+async def _walk(where, params):
+    """Jalan dari halaman pertama sampai habis (n), lalu balik lagi (p). Balikin (maju, mundur)."""
+    forward, pages = [], []
+    rows, page, has_prev, has_next = await agenda1.load_agenda_page(where, params, 1)
+    assert not has_prev
+    while True:
+        assert 0 < len(rows) <= agenda1.ITEMS_PER_PAGE
+        pages.append([r["id"] for r in rows])
+        forward.extend(rows)
+        if not has_next:
+            break
+        last = rows[-1]
+        rows, page, has_prev, has_next = await agenda1.load_agenda_page(
+            where, params, page + 1, "n", (last["deadline"], last["id"])
+        )
+        assert has_prev
+
+    backward = [pages[-1]]
+    while len(backward) < len(pages):
+        first = rows[0]
+        rows, page, has_prev, has_next = await agenda1.load_agenda_page(
+            where, params, page - 1, "p", (first["deadline"], first["id"])
+        )
+        assert has_next
+        backward.append([r["id"] for r in rows])
+    return forward, pages, backward[::-1]
+
+
+def test_picker_paging_10k_agendas_1k_users(fresh_db):
+    users = _seed(fresh_db)
+    assert fresh_db.fetch_one("SELECT COUNT(*) AS n FROM agenda_penting")["n"] == 10000
+
+    everything = fresh_db.fetch_all("SELECT id, user_id, deadline, status FROM agenda_penting")
+    expected = {}
+    for r in everything:
+        expected.setdefault((r["user_id"], "delete"), []).append(r)
+        if r["status"] == "aktif":
+            expected.setdefault((r["user_id"], "view"), []).append(r)
+
+    async def run():
+        for user_id in users.values():
+            for mode in ("view", "delete"):
+                forward, pages, backward = await _walk(agenda1._picker_where(mode), (user_id,))
+                want = sorted(expected[(user_id, mode)], key=lambda r: (r["deadline"], r["id"]))
+                # cuma agenda user ini, tiap agenda muncul tepat sekali, urut (deadline, id)
+                assert [r["id"] for r in forward] == [r["id"] for r in want]
+                assert backward == pages
+
+    asyncio.run(run())
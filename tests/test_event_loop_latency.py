@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+# ~3 juta row lewat CTE rekursif: cukup buat nahan satu koneksi SQLite kira-kira sedetik
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 3000000) "
+    "SELECT COUNT(*) AS n FROM c"
+)
+
+
+def _p99(samples):
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.99) - 1]
+
+
+def test_handler_p99_flat_during_slow_query(fresh_db):
+    """Query lambat jalan di thread DB, jadi handler lain (loop + query cepat) tetap responsif."""
+
+    async def run():
+        loop_lag, fast_query = [], []
+        slow = asyncio.create_task(fresh_db.afetch_one(SLOW_QUERY))
+        await asyncio.sleep(0.05)  # pastiin query lambat sudah jalan duluan
+        while not slow.done():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            loop_lag.append(time.perf_counter() - started - 0.005)
+
+            started = time.perf_counter()
+            assert (await fresh_db.afetch_one("SELECT 1 AS x"))["x"] == 1
+            fast_query.append(time.perf_counter() - started)
+        return await slow, loop_lag, fast_query
+
+    slow_row, loop_lag, fast_query = asyncio.run(run())
+
+    assert slow_row["n"] == 3000000
+    assert len(fast_query) >= 20, "query lambat kelar terlalu cepat, sampel kurang"
+    assert _p99(loop_lag) < 0.05
+    assert _p99(fast_query) < 0.05
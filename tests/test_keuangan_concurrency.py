@@ -0,0 +1,49 @@
+import asyncio
+
+import keuangan
+
+USER = 2001
+
+
+def _saldo(db):
+    return db.fetch_one(
+        "SELECT total_tabungan, total_pakai, total_pengeluaran, jumlah_transaksi FROM keuangan_saldo WHERE user_id=%s",
+        (USER,),
+    )
+
+
+def test_concurrent_spends_same_user(fresh_db):
+    """Dua pemakaian tabungan + pengeluaran barengan buat user yang sama: gak ada yang error, saldo gak jebol."""
+    fresh_db.run_in_transaction(keuangan._tambah_tabungan, USER, 10000, "modal")
+
+    async def run():
+        return await asyncio.gather(
+            fresh_db.arun_in_transaction(keuangan._pakai_tabungan, USER, 6000, "a"),
+            fresh_db.arun_in_transaction(keuangan._pakai_tabungan, USER, 6000, "b"),
+            fresh_db.arun_in_transaction(keuangan._catat_pengeluaran, USER, "makan", "x", 500),
+            fresh_db.arun_in_transaction(keuangan._catat_pengeluaran, USER, "makan", "y", 500),
+        )
+
+    (ok_a, _), (ok_b, _), _, _ = asyncio.run(run())  # exception (deadlock dsb) bikin test gagal di sini
+
+    # cuma satu pemakaian 6000 yang boleh lolos dari saldo 10000
+    assert sorted([ok_a, ok_b]) == [False, True]
+    saldo = _saldo(fresh_db)
+    assert saldo["total_tabungan"] == 10000
+    assert saldo["total_pakai"] == 6000
+    assert saldo["total_pengeluaran"] == 1000
+    assert saldo["jumlah_transaksi"] == 4
+    assert fresh_db.fetch_one("SELECT COUNT(*) AS n FROM pakai_tabungan WHERE user_id=%s", (USER,))["n"] == 1
+
+
+def test_spends_first_write_creates_saldo(fresh_db):
+    """User baru: transaksi pertama barengan harus bikin satu row saldo, bukan gagal di duplikat."""
+    async def run():
+        return await asyncio.gather(*(
+            fresh_db.arun_in_transaction(keuangan._catat_pengeluaran, USER, "makan", f"d{i}", 100) for i in range(10)
+        ))
+
+    asyncio.run(run())
+    saldo = _saldo(fresh_db)
+    assert saldo["total_pengeluaran"] == 1000
+    assert saldo["jumlah_transaksi"] == 10
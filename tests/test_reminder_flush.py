@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import agenda1
+import sender
+from conftest import add_users
+
+
+class _App:
+    def __init__(self, bot):
+        self.bot = bot
+
+
+def test_flush_skips_agenda_closed_during_tick(fresh_db, monkeypatch):
+    """Agenda yang ditandai selesai / dihapus pas reminder-nya lagi dikirim gak boleh dapet row state lagi."""
+    monkeypatch.setitem(sender.SEND_CONFIG, "per_chat_interval", 0)
+    add_users([4001])
+    now = datetime.now().replace(microsecond=0)
+    ids = {
+        name: fresh_db.run_in_transaction(agenda1._create_agenda, 4001, name, now + timedelta(hours=2))
+        for name in ("tetap", "selesai", "hapus")
+    }
+
+    class Bot:
+        async def send_message(self, chat_id, text, **kwargs):
+            # sama kayak action_handler: ubah status/hapus + bersihin state dalam satu transaksi
+            await fresh_db.aexecute_batch([
+                ("UPDATE agenda_penting SET status='selesai' WHERE id=%s", (ids["selesai"],)),
+                ("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ids["selesai"],)),
+            ])
+            await fresh_db.aexecute_batch([
+                ("DELETE FROM agenda_reminder WHERE agenda_id=%s", (ids["hapus"],)),
+                ("DELETE FROM agenda_penting WHERE id=%s", (ids["hapus"],)),
+            ])
+
+    asyncio.run(agenda1._reminder_tick(_App(Bot()), now))
+
+    state = {r["agenda_id"]: r for r in fresh_db.fetch_all("SELECT agenda_id, stage FROM agenda_reminder")}
+    assert set(state) == {ids["tetap"]}
+    assert state[ids["tetap"]]["stage"] == "hourly"
@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import agenda1
+import leader
+from conftest import add_users
+
+
+class _Bot:
+    def __init__(self):
+        self.sent = asyncio.Event()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.set()
+
+
+class _App:
+    def __init__(self):
+        self.bot = _Bot()
+
+
+def test_loop_wakes_for_agenda_from_other_instance(fresh_db, monkeypatch):
+    """Agenda yang ditulis instance lain (tanpa rearm_reminders di proses ini) tetap bangunin loop yang tidur."""
+    monkeypatch.setattr(agenda1, "REMINDER_CHANGE_POLL", 0.2)
+    users = add_users([3001])
+
+    async def run():
+        app = _App()
+        loop_task = asyncio.create_task(agenda1.reminder_loop(app, lease=leader.ALWAYS))
+        try:
+            await asyncio.sleep(0.3)  # tick pertama: belum ada agenda -> tidur REMINDER_MAX_IDLE
+            # insert langsung ke DB, kayak dari proses lain
+            fresh_db.execute_query(
+                "INSERT INTO agenda_penting (user_id, nama_agenda, deadline, status) VALUES (%s, %s, %s, 'aktif')",
+                (users[3001], "dari instance lain", datetime.now() + timedelta(hours=2)),
+            )
+            await asyncio.wait_for(app.bot.sent.wait(), 3)
+        finally:
+            loop_task.cancel()
+            agenda1._reminder_wakeups.clear()
+
+    asyncio.run(run())